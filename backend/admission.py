@@ -0,0 +1,98 @@
+import asyncio
+from collections import deque
+from typing import Dict
+
+
+class AdmissionController:
+    """
+    Bounded concurrency for expensive endpoints.
+
+    At most `max_in_flight` requests run at once. Up to `max_queue` more may
+    wait, first come first served, for at most `queue_timeout` seconds. Anything
+    beyond that is rejected straight away so the requests that are admitted
+    keep a stable latency instead of everyone waiting longer.
+
+    Meant to be used from a single event loop, so no locking is needed.
+    """
+
+    def __init__(self, max_in_flight: int = 8, max_queue: int = 32,
+                 queue_timeout: float = 1.0, retry_after: int = 1):
+        if max_in_flight < 1:
+            raise ValueError("max_in_flight must be at least 1")
+        if max_queue < 0:
+            raise ValueError("max_queue must not be negative")
+
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self.in_flight = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self._waiters: deque = deque()
+
+    async def acquire(self) -> bool:
+        """
+        Wait for a free slot.
+
+        Returns:
+            True if the request was admitted and must call release() later,
+            False if it should be shed
+        """
+        if self.in_flight < self.max_in_flight and not self._waiters:
+            self.in_flight += 1
+            self.admitted += 1
+            return True
+
+        if len(self._waiters) >= self.max_queue:
+            self.rejected += 1
+            return False
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._discard(waiter)
+            if not (waiter.done() and not waiter.cancelled()):
+                self.timed_out += 1
+                return False
+        except BaseException:
+            # The client went away; pass on a slot we may already have been handed
+            self._discard(waiter)
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+
+        self.admitted += 1
+        return True
+
+    def release(self):
+        """Free a slot, handing it straight to the oldest waiter if there is one."""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                # The slot moves to the waiter, so in_flight stays the same
+                waiter.set_result(True)
+                return
+        self.in_flight -= 1
+
+    def _discard(self, waiter: asyncio.Future):
+        """Remove a waiter that gave up from the queue."""
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+
+    def get_stats(self) -> Dict[str, int]:
+        """Get current load and counters since startup."""
+        return {
+            'in_flight': self.in_flight,
+            'queued': len(self._waiters),
+            'max_in_flight': self.max_in_flight,
+            'max_queue': self.max_queue,
+            'admitted': self.admitted,
+            'rejected': self.rejected,
+            'timed_out': self.timed_out
+        }
@@ -1,9 +1,16 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Dict, List, Optional
+import gzip
+import hashlib
+import json
+import os
 import uvicorn
 
+from admission import AdmissionController
 from recommender import get_recommender, MovieRecommender
 
 # Initialize FastAPI app
@@ -20,13 +27,42 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "Retry-After"],
 )
 
+# Admission control for model-backed endpoints. Cheap endpoints such as
+# /health and /options bypass it so they stay responsive under load.
+admission = AdmissionController(
+    max_in_flight=int(os.environ.get("ADMISSION_MAX_IN_FLIGHT", "8")),
+    max_queue=int(os.environ.get("ADMISSION_MAX_QUEUE", "32")),
+    queue_timeout=float(os.environ.get("ADMISSION_QUEUE_TIMEOUT", "1.0")),
+    retry_after=int(os.environ.get("ADMISSION_RETRY_AFTER", "1"))
+)
+ADMISSION_CONTROLLED_PATHS = {"/recommend", "/recommendations", "/search", "/seen"}
+
+@app.middleware("http")
+async def admission_control(request: Request, call_next):
+    """Cap concurrent model requests and shed load once the wait queue is full."""
+    if request.url.path not in ADMISSION_CONTROLLED_PATHS:
+        return await call_next(request)
+    
+    if not await admission.acquire():
+        return JSONResponse(
+            status_code=503,
+            content={"detail": "Server is overloaded, please retry later"},
+            headers={"Retry-After": str(admission.retry_after)}
+        )
+    try:
+        return await call_next(request)
+    finally:
+        admission.release()
+
 # Pydantic models for request/response
 class RecommendationRequest(BaseModel):
     mood: str
     weather: str
     day: str
+    user_id: Optional[str] = None
 
 class MovieRecommendation(BaseModel):
     movie_title: str
@@ -41,6 +77,9 @@ class MultipleRecommendationRequest(BaseModel):
     weather: str
     day: str
     num_recommendations: Optional[int] = 3
+    user_id: Optional[str] = None
+    diversity: Optional[float] = None
+    popularity_weight: Optional[float] = None
 
 class MultipleMovieRecommendation(BaseModel):
     movie_title: str
@@ -50,6 +89,24 @@ class MultipleMovieRecommendation(BaseModel):
     genre: Optional[str] = None
     description: Optional[str] = None
 
+class SearchResult(BaseModel):
+    movie_title: str
+    score: float
+    year: Optional[int] = None
+    genre: Optional[str] = None
+    description: Optional[str] = None
+    variants: List[str] = []
+
+class SeenHistoryRequest(BaseModel):
+    user_id: str
+    movie_titles: List[str]
+
+class FeedbackRequest(BaseModel):
+    mood: str
+    weather: str
+    day: str
+    movie_title: str
+
 class AvailableOptionsResponse(BaseModel):
     moods: List[str]
     weather: List[str]
@@ -58,6 +115,56 @@ class AvailableOptionsResponse(BaseModel):
 # Global recommender instance
 recommender: MovieRecommender = None
 
+def require_recommender() -> MovieRecommender:
+    """Get the recommender, or fail with 503 while it is not loaded."""
+    if recommender is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Recommender not initialized",
+            headers={"Retry-After": "5"}
+        )
+    return recommender
+
+# Encoded /snapshot payload, built on first request
+SNAPSHOT_SCHEMA_VERSION = 1
+snapshot_cache: Optional[Dict] = None
+
+def build_snapshot_cache() -> Dict:
+    """Build the snapshot payload once, with its ETag and a gzip-compressed copy."""
+    payload = recommender.build_snapshot()
+    content = json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    version = hashlib.sha256(content).hexdigest()[:16]
+    
+    payload = {"schema_version": SNAPSHOT_SCHEMA_VERSION, "version": version, **payload}
+    body = json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    return {
+        "etag": f'"{version}"',
+        "body": body,
+        "gzip_body": gzip.compress(body, compresslevel=9)
+    }
+
+def accepts_gzip(accept_encoding: str) -> bool:
+    """Check whether an Accept-Encoding header allows gzip, honouring q-values such as "gzip;q=0"."""
+    qualities = {}
+    for entry in accept_encoding.split(","):
+        coding, _, params = entry.strip().partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding:
+            qualities[coding.strip().lower()] = quality
+    return qualities.get("gzip", qualities.get("*", 0.0)) > 0
+
+def internal_error(message: str, error: Exception) -> HTTPException:
+    """Log an unexpected error and build a 500 response without leaking its details."""
+    print(f"{message}: {error!r}")
+    return HTTPException(status_code=500, detail=message)
+
 @app.on_event("startup")
 async def startup_event():
     """Initialize the recommender on startup."""
@@ -69,6 +176,12 @@ async def startup_event():
         print(f"Error starting API: {e}")
         print("Please ensure you have trained the model first by running train_model.py")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Persist the popularity counters on shutdown."""
+    if recommender is not None:
+        recommender.popularity.close()
+
 @app.get("/", response_model=dict)
 async def root():
     """Root endpoint with API information."""
@@ -79,6 +192,11 @@ async def root():
             "GET /options": "Get available mood, weather, and day options",
             "POST /recommend": "Get a single movie recommendation",
             "POST /recommendations": "Get multiple movie recommendations",
+            "GET /search?q=": "Search movies by title and description",
+            "POST /seen": "Record movies a user has already seen",
+            "POST /feedback": "Record a recommended movie a user picked",
+            "GET /memory": "Memory held by each loaded component",
+            "GET /snapshot": "Ranked recommendations for every context, for offline use",
             "GET /health": "Health check endpoint"
         }
     }
@@ -88,21 +206,23 @@ async def health_check():
     """Health check endpoint."""
     return {
         "status": "healthy",
-        "message": "Movie recommendation API is running"
+        "message": "Movie recommendation API is running",
+        "admission": admission.get_stats()
     }
 
 @app.get("/options", response_model=AvailableOptionsResponse)
 async def get_available_options():
     """Get available options for mood, weather, and day."""
     try:
-        if recommender is None:
-            raise HTTPException(status_code=500, detail="Recommender not initialized")
+        require_recommender()
         
         options = recommender.get_available_options()
         return AvailableOptionsResponse(**options)
     
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error getting options: {str(e)}")
+        raise internal_error("Error getting options", e)
 
 @app.post("/recommend", response_model=MovieRecommendation)
 async def recommend_movie(request: RecommendationRequest):
@@ -117,21 +237,24 @@ async def recommend_movie(request: RecommendationRequest):
     }
     """
     try:
-        if recommender is None:
-            raise HTTPException(status_code=500, detail="Recommender not initialized")
+        require_recommender()
         
-        recommendation = recommender.recommend_movie(
+        recommendation = await run_in_threadpool(
+            recommender.recommend_movie,
             mood=request.mood,
             weather=request.weather,
-            day=request.day
+            day=request.day,
+            user_id=request.user_id
         )
         
         return MovieRecommendation(**recommendation)
     
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error in recommendation: {str(e)}")
+        raise internal_error("Error in recommendation", e)
 
 @app.post("/recommendations", response_model=List[MultipleMovieRecommendation])
 async def get_multiple_recommendations(request: MultipleRecommendationRequest):
@@ -143,12 +266,19 @@ async def get_multiple_recommendations(request: MultipleRecommendationRequest):
         "mood": "Happy",
         "weather": "Sunny",
         "day": "Weekend", 
-        "num_recommendations": 5
+        "num_recommendations": 5,
+        "diversity": 0.3,
+        "popularity_weight": 0.2
     }
+    
+    diversity is optional (0-1); higher values trade relevance for variety.
+    popularity_weight is optional (0-1); it mixes in how often users recently
+    picked each movie in the same context (see POST /feedback).
+    confidence is always the model probability, not the blended or
+    diversified score the movies were ranked by.
     """
     try:
-        if recommender is None:
-            raise HTTPException(status_code=500, detail="Recommender not initialized")
+        require_recommender()
         
         # Validate num_recommendations
         if request.num_recommendations < 1 or request.num_recommendations > 10:
@@ -157,26 +287,120 @@ async def get_multiple_recommendations(request: MultipleRecommendationRequest):
                 detail="num_recommendations must be between 1 and 10"
             )
         
-        recommendations = recommender.get_multiple_recommendations(
+        if request.diversity is not None and not 0 <= request.diversity <= 1:
+            raise HTTPException(status_code=400, detail="diversity must be between 0 and 1")
+        
+        if request.popularity_weight is not None and not 0 <= request.popularity_weight <= 1:
+            raise HTTPException(status_code=400, detail="popularity_weight must be between 0 and 1")
+        
+        recommendations = await run_in_threadpool(
+            recommender.get_multiple_recommendations,
             mood=request.mood,
             weather=request.weather,
             day=request.day,
-            num_recommendations=request.num_recommendations
+            num_recommendations=request.num_recommendations,
+            user_id=request.user_id,
+            diversity=request.diversity,
+            popularity_weight=request.popularity_weight
         )
         
         return [MultipleMovieRecommendation(**rec) for rec in recommendations]
     
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise internal_error("Error in recommendations", e)
+
+@app.post("/seen", response_model=dict)
+async def record_seen_movies(request: SeenHistoryRequest):
+    """
+    Record movies a user has already seen.
+    
+    Recommendation requests carrying the same user_id will rank these movies last.
+    
+    Example request:
+    {
+        "user_id": "user-42",
+        "movie_titles": ["3 Idiots", "Dangal"]
+    }
+    """
+    try:
+        require_recommender()
+        
+        seen_count = await run_in_threadpool(recommender.mark_seen, request.user_id, request.movie_titles)
+        return {
+            "user_id": request.user_id,
+            "seen_count": seen_count
+        }
+    
+    except HTTPException:
+        raise
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error in recommendations: {str(e)}")
+        raise internal_error("Error recording seen movies", e)
+
+@app.post("/feedback", response_model=dict)
+async def record_feedback(request: FeedbackRequest):
+    """
+    Record that a user picked a recommended movie.
+    
+    Picks feed the decayed per-context popularity that /recommendations
+    blends in when popularity_weight is set.
+    
+    Example request:
+    {
+        "mood": "Happy",
+        "weather": "Sunny",
+        "day": "Weekend",
+        "movie_title": "3 Idiots"
+    }
+    """
+    try:
+        require_recommender()
+        
+        recommender.record_accept(request.mood, request.weather, request.day, request.movie_title)
+        return {"status": "recorded"}
+    
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise internal_error("Error recording feedback", e)
+
+@app.get("/search", response_model=List[SearchResult])
+async def search_movies(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(10, ge=1, le=50)
+):
+    """
+    Search movies by title and description.
+    
+    The last word of the query is matched as a prefix, so this endpoint can
+    back a type-ahead box. Title variants such as dubbed versions are grouped
+    under the best matching title.
+    
+    Example: GET /search?q=3 idi&limit=5
+    """
+    try:
+        require_recommender()
+        
+        results = await run_in_threadpool(recommender.search_movies, q, limit)
+        return [SearchResult(**result) for result in results]
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise internal_error("Error in search", e)
 
 @app.get("/model-info", response_model=dict)
 async def get_model_info():
     """Get information about the trained model."""
     try:
-        if recommender is None:
-            raise HTTPException(status_code=500, detail="Recommender not initialized")
+        require_recommender()
         
         # Get some basic model information
         options = recommender.get_available_options()
@@ -186,12 +410,70 @@ async def get_model_info():
             "features": ["mood", "weather", "day"],
             "target": "movie_title",
             "available_options": options,
-            "total_movies": len(options.get("movies", [])),
+            "total_movies": len(recommender.catalog),
+            "search_index": recommender.search_index.get_stats(),
+            "popularity": recommender.popularity.get_stats(),
             "status": "loaded"
         }
     
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise internal_error("Error getting model info", e)
+
+@app.get("/snapshot")
+async def get_snapshot(request: Request):
+    """
+    Get the ranked recommendations for every mood, weather and day context.
+    
+    The payload carries the catalog as parallel columns and, per
+    "mood|weather|day" key, the top movie ids and confidences, so a client can
+    fetch it once and answer every later selection locally. It is served gzip
+    compressed when the client accepts it, and clients should revalidate with
+    If-None-Match to get a 304 while the model is unchanged.
+    """
+    global snapshot_cache
+    try:
+        require_recommender()
+        
+        if snapshot_cache is None:
+            snapshot_cache = await run_in_threadpool(build_snapshot_cache)
+        
+        headers = {
+            "ETag": snapshot_cache["etag"],
+            "Cache-Control": "no-cache",
+            "Vary": "Accept-Encoding"
+        }
+        
+        # Answer revalidation without sending the payload again
+        if_none_match = request.headers.get("if-none-match", "")
+        candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        if snapshot_cache["etag"] in candidates or "*" in candidates:
+            return Response(status_code=304, headers=headers)
+        
+        if accepts_gzip(request.headers.get("accept-encoding", "")):
+            headers["Content-Encoding"] = "gzip"
+            return Response(content=snapshot_cache["gzip_body"], media_type="application/json", headers=headers)
+        
+        return Response(content=snapshot_cache["body"], media_type="application/json", headers=headers)
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise internal_error("Error building snapshot", e)
+
+@app.get("/memory", response_model=dict)
+async def get_memory_report():
+    """Get an estimate of the memory, in bytes, held by each loaded component."""
+    try:
+        require_recommender()
+        
+        return await run_in_threadpool(recommender.get_memory_report)
+    
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error getting model info: {str(e)}")
+        raise internal_error("Error getting memory report", e)
 
 if __name__ == "__main__":
     uvicorn.run(
@@ -0,0 +1,193 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+from typing import Callable, Dict, IO, List, Optional
+
+# Files that together make up one trained artifact set
+ARTIFACT_FILES = [
+    'model.pkl',
+    'mood_encoder.pkl',
+    'weather_encoder.pkl',
+    'day_encoder.pkl',
+    'movie_encoder.pkl',
+    'movie_metadata.json',
+    'encoder_mappings.json'
+]
+MANIFEST_FILE = 'artifact_manifest.json'
+# Copies of sets that verified and loaded, one directory per set plus a CURRENT pointer
+KNOWN_GOOD_DIR = 'known_good_artifacts'
+KNOWN_GOOD_POINTER = 'CURRENT'
+
+
+class ArtifactError(Exception):
+    """Raised when no artifact set passes its integrity checks."""
+
+
+def file_sha256(path: str) -> str:
+    """Get the SHA-256 hex digest of a file, reading it in 1 MB chunks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _fsync_directory(directory: str):
+    """Make a rename inside a directory durable (a no-op where directories cannot be opened)."""
+    try:
+        fd = os.open(directory or '.', os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def atomic_write(path: str, write: Callable[[IO], None], binary: bool = True):
+    """
+    Write a file so readers only ever see the old or the complete new content.
+
+    The content goes to a temporary file in the same directory, which is
+    flushed, fsynced and renamed over `path`.
+
+    Args:
+        path: Destination file
+        write: Called with the open temporary file to write the content
+        binary: Open the temporary file in binary mode, otherwise UTF-8 text
+    """
+    directory = os.path.dirname(path)
+    temp_path = os.path.join(directory, f'.{os.path.basename(path)}.{os.getpid()}.tmp')
+    try:
+        with open(temp_path, 'wb' if binary else 'w', **({} if binary else {'encoding': 'utf-8'})) as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    _fsync_directory(directory)
+
+
+def write_manifest(directory: str = '.', files: Optional[List[str]] = None) -> Dict:
+    """
+    Record the size and checksum of every artifact in a manifest, written atomically.
+
+    Call this after all artifacts are written: a set whose files do not match
+    its manifest, for example because training was interrupted halfway through
+    saving, is rejected when loading.
+
+    Returns:
+        The manifest
+    """
+    manifest = {
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'files': {}
+    }
+    for name in files or ARTIFACT_FILES:
+        path = os.path.join(directory, name)
+        manifest['files'][name] = {'sha256': file_sha256(path), 'size': os.path.getsize(path)}
+
+    atomic_write(os.path.join(directory, MANIFEST_FILE),
+                 lambda f: json.dump(manifest, f, indent=2), binary=False)
+    return manifest
+
+
+def verify_artifacts(directory: str = '.') -> List[str]:
+    """
+    Check an artifact set against its manifest.
+
+    Returns:
+        Problems found; an empty list means every file is present and intact
+    """
+    try:
+        with open(os.path.join(directory, MANIFEST_FILE), 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return [f"no {MANIFEST_FILE} in {directory}"]
+    except (OSError, ValueError) as e:
+        return [f"unreadable {MANIFEST_FILE} in {directory}: {e}"]
+
+    problems = []
+    for name in ARTIFACT_FILES:
+        expected = manifest.get('files', {}).get(name)
+        path = os.path.join(directory, name)
+        if expected is None:
+            problems.append(f"{name} is not in the manifest")
+        elif not os.path.exists(path):
+            problems.append(f"{name} is missing")
+        elif os.path.getsize(path) != expected['size'] or file_sha256(path) != expected['sha256']:
+            problems.append(f"{name} does not match its checksum")
+    return problems
+
+
+def known_good_directory(root: str = '.') -> Optional[str]:
+    """Get the directory of the last known-good artifact set, if there is one."""
+    try:
+        with open(os.path.join(root, KNOWN_GOOD_DIR, KNOWN_GOOD_POINTER), 'r', encoding='utf-8') as f:
+            set_id = f.read().strip()
+    except FileNotFoundError:
+        return None
+
+    directory = os.path.join(root, KNOWN_GOOD_DIR, set_id)
+    return directory if set_id and os.path.isdir(directory) else None
+
+
+def promote_known_good(directory: str = '.', root: str = '.', keep: int = 2) -> str:
+    """
+    Keep a copy of a verified artifact set as the last known-good set.
+
+    The set is copied into its own directory, named after the manifest
+    checksum, before the CURRENT pointer is atomically switched to it, so a
+    crash at any point leaves the previous known-good set usable. Only the
+    `keep` most recent sets are retained.
+
+    Returns:
+        The known-good directory of the set
+    """
+    set_id = file_sha256(os.path.join(directory, MANIFEST_FILE))[:16]
+    base = os.path.join(root, KNOWN_GOOD_DIR)
+    target = os.path.join(base, set_id)
+    if known_good_directory(root) == target:
+        return target
+
+    os.makedirs(base, exist_ok=True)
+    if not os.path.isdir(target) or verify_artifacts(target):
+        staging = os.path.join(base, f'.{set_id}.{os.getpid()}.tmp')
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+        for name in ARTIFACT_FILES + [MANIFEST_FILE]:
+            with open(os.path.join(directory, name), 'rb') as source:
+                atomic_write(os.path.join(staging, name), lambda f: shutil.copyfileobj(source, f))
+        shutil.rmtree(target, ignore_errors=True)
+        try:
+            os.rename(staging, target)
+        except OSError:
+            # Another worker promoted the same set first
+            shutil.rmtree(staging, ignore_errors=True)
+        _fsync_directory(base)
+
+    atomic_write(os.path.join(base, KNOWN_GOOD_POINTER), lambda f: f.write(set_id), binary=False)
+
+    # Drop older sets, oldest first
+    sets = sorted((entry for entry in os.scandir(base) if entry.is_dir() and not entry.name.startswith('.')),
+                  key=lambda entry: entry.stat().st_mtime)
+    for entry in sets[:-keep] if keep > 0 else []:
+        if entry.path != target:
+            shutil.rmtree(entry.path, ignore_errors=True)
+    return target
+
+
+def candidate_directories(root: str = '.') -> List[str]:
+    """Get the artifact sets to try loading, newest first: the working set, then the last known-good set."""
+    candidates = [root]
+    known_good = known_good_directory(root)
+    if known_good is not None:
+        candidates.append(known_good)
+    return candidates
@@ -0,0 +1,120 @@
+import sys
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from memory_report import deep_sizeof
+
+MISSING_YEAR = 0
+MISSING_GENRE = -1
+
+
+class MovieCatalog:
+    """
+    Columnar, read-only movie catalog ordered by movie class id.
+
+    Instead of one dict per movie, every attribute is a parallel column:
+    titles are shared with `movie_encoder.classes_`, years are a small integer
+    array, genres are codes into a list of interned names and all descriptions
+    live in one UTF-8 buffer addressed by offsets. Dict records are only built
+    when a response needs them.
+    """
+
+    def __init__(self, titles: np.ndarray, movie_metadata: Iterable[Dict]):
+        """
+        Args:
+            titles: Movie titles indexed by class id (`movie_encoder.classes_`)
+            movie_metadata: Records with movie_title, year, genre and description
+        """
+        self.titles = titles
+        num_movies = len(titles)
+        class_ids = {title: i for i, title in enumerate(titles)}
+
+        self.years = np.full(num_movies, MISSING_YEAR, dtype=np.int16)
+        self.genre_codes = np.full(num_movies, MISSING_GENRE, dtype=np.int16)
+        self.genre_names: List[str] = []
+        genre_lookup: Dict[str, int] = {}
+        descriptions: List[bytes] = [b''] * num_movies
+
+        for movie in movie_metadata:
+            class_id = class_ids.get(movie.get('movie_title'))
+            if class_id is None:
+                continue
+
+            year = movie.get('year')
+            try:
+                self.years[class_id] = int(year)
+            except (TypeError, ValueError, OverflowError):
+                pass  # Missing, NaN or malformed years stay unknown
+
+            genre = movie.get('genre')
+            if genre:
+                if genre not in genre_lookup:
+                    genre_lookup[genre] = len(self.genre_names)
+                    self.genre_names.append(sys.intern(genre))
+                self.genre_codes[class_id] = genre_lookup[genre]
+
+            description = movie.get('description')
+            if description:
+                descriptions[class_id] = str(description).encode('utf-8')
+
+        lengths = np.fromiter((len(d) for d in descriptions), dtype=np.int64, count=num_movies)
+        self.description_offsets = np.zeros(num_movies + 1, dtype=np.int64)
+        np.cumsum(lengths, out=self.description_offsets[1:])
+        self.description_buffer = b''.join(descriptions)
+
+    def __len__(self) -> int:
+        return len(self.titles)
+
+    def title(self, class_id: int) -> str:
+        """Get the title of a movie."""
+        return str(self.titles[class_id])
+
+    def year(self, class_id: int) -> Optional[int]:
+        """Get the release year of a movie, if known."""
+        year = int(self.years[class_id])
+        return None if year == MISSING_YEAR else year
+
+    def genre(self, class_id: int) -> Optional[str]:
+        """Get the genre of a movie, if known."""
+        code = int(self.genre_codes[class_id])
+        return None if code == MISSING_GENRE else self.genre_names[code]
+
+    def description(self, class_id: int) -> Optional[str]:
+        """Get the description of a movie, if known."""
+        start = self.description_offsets[class_id]
+        end = self.description_offsets[class_id + 1]
+        if start == end:
+            return None
+        return self.description_buffer[start:end].decode('utf-8')
+
+    def record(self, class_id: int) -> Dict:
+        """Materialize the metadata of one movie as a dict."""
+        class_id = int(class_id)
+        return {
+            'movie_title': self.title(class_id),
+            'year': self.year(class_id),
+            'genre': self.genre(class_id),
+            'description': self.description(class_id)
+        }
+
+    def to_columns(self) -> Dict[str, List]:
+        """Export the catalog as JSON-friendly parallel lists ordered by class id."""
+        return {
+            'titles': [str(title) for title in self.titles],
+            'years': [None if year == MISSING_YEAR else year for year in self.years.tolist()],
+            'genre_codes': self.genre_codes.tolist(),
+            'genre_names': list(self.genre_names),
+            'descriptions': [self.description(class_id) for class_id in range(len(self))]
+        }
+
+    def get_memory_usage(self) -> Dict[str, int]:
+        """Get the bytes held by each column."""
+        return {
+            'years': self.years.nbytes,
+            'genre_codes': self.genre_codes.nbytes,
+            'genre_names': deep_sizeof(self.genre_names),
+            'description_offsets': self.description_offsets.nbytes,
+            'description_buffer': sys.getsizeof(self.description_buffer)
+        }
+
@@ -0,0 +1,249 @@
+import copy
+import os
+import tempfile
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sklearn.base import clone
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.tree._tree import Tree
+
+
+def shard_rows(num_rows: int, n_shards: int, random_state: int = 42) -> List[np.ndarray]:
+    """Randomly partition row indices into n_shards disjoint shards of near-equal size."""
+    rng = np.random.default_rng(random_state)
+    return np.array_split(rng.permutation(num_rows), n_shards)
+
+
+def trees_per_shard(n_estimators: int, n_shards: int) -> List[int]:
+    """Split the total number of trees across shards, the first shards taking any remainder."""
+    base, remainder = divmod(n_estimators, n_shards)
+    return [base + (1 if shard < remainder else 0) for shard in range(n_shards)]
+
+
+def write_shards(X, y, directory: str, n_shards: int, random_state: int = 42) -> List[str]:
+    """
+    Partition rows into random, disjoint shards and write each one to its own file.
+
+    Only one shard is copied out of `X` at a time.
+
+    Args:
+        X: Feature matrix (array or DataFrame)
+        y: Encoded target labels
+        directory: Where the shard files go; shared storage if workers run on other machines
+        n_shards: Number of partitions
+        random_state: Seed for the partitioning
+
+    Returns:
+        Paths of the shard files, one .npz per shard holding its `X` and `y`
+    """
+    os.makedirs(directory, exist_ok=True)
+    y = np.asarray(y)
+    paths = []
+    for shard, rows in enumerate(shard_rows(len(y), n_shards, random_state)):
+        path = os.path.join(directory, f'shard-{shard:04d}.npz')
+        np.savez(path, X=X.iloc[rows].to_numpy() if hasattr(X, 'iloc') else np.asarray(X)[rows], y=y[rows])
+        paths.append(path)
+    return paths
+
+
+def balanced_class_weights(shard_paths: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Compute sklearn's 'balanced' class weights over every shard, reading only the labels.
+
+    Returns:
+        Sorted classes of the full dataset and the weight of each class
+    """
+    counts: Dict[int, int] = {}
+    for path in shard_paths:
+        with np.load(path) as shard:
+            shard_classes, shard_counts = np.unique(shard['y'], return_counts=True)
+        for label, count in zip(shard_classes.tolist(), shard_counts.tolist()):
+            counts[label] = counts.get(label, 0) + count
+
+    classes = np.array(sorted(counts))
+    class_counts = np.array([counts[label] for label in classes], dtype=np.float64)
+    return classes, class_counts.sum() / (len(classes) * class_counts)
+
+
+def _widen_tree(estimator, column_ids: np.ndarray, num_classes: int):
+    """
+    Re-index a fitted tree's class columns into the global class space.
+
+    A shard may not contain every class, so its trees only have columns for
+    the classes it saw. Columns for the other classes are filled with zeros.
+    """
+    state = estimator.tree_.__getstate__()
+    values = state['values']
+    widened = np.zeros((values.shape[0], values.shape[1], num_classes), dtype=values.dtype)
+    widened[:, :, column_ids] = values
+    state['values'] = widened
+
+    tree = Tree(estimator.tree_.n_features, np.array([num_classes], dtype=np.intp), estimator.n_outputs_)
+    tree.__setstate__(state)
+
+    estimator.tree_ = tree
+    estimator.n_classes_ = num_classes
+    estimator.classes_ = np.arange(num_classes, dtype=np.float64)
+    return estimator
+
+
+def _fit_shard(task: Dict) -> RandomForestClassifier:
+    """Train one shard's forest on its partition, loaded from its file. Runs in a worker process."""
+    with np.load(task['path']) as shard:
+        X, y = shard['X'], shard['y']
+
+    classes = task['classes']
+    sample_weight = None
+    if task['class_weights'] is not None:
+        sample_weight = task['class_weights'][np.searchsorted(classes, y)]
+
+    forest = clone(task['model'])
+    forest.set_params(n_estimators=task['n_estimators'], random_state=task['random_state'], n_jobs=1,
+                      class_weight=None)
+    forest.fit(X, y, sample_weight=sample_weight)
+
+    column_ids = np.searchsorted(classes, forest.classes_)
+    for estimator in forest.estimators_:
+        _widen_tree(estimator, column_ids, len(classes))
+    return forest
+
+
+def merge_forests(forests: List[RandomForestClassifier], classes: np.ndarray,
+                  model: RandomForestClassifier) -> RandomForestClassifier:
+    """
+    Merge independently trained forests into one RandomForestClassifier.
+
+    Args:
+        forests: Fitted forests, each trained on its own data partition, with
+            trees already widened to the full class space
+        classes: Sorted labels of the full dataset
+        model: The unfitted forest whose parameters the merged forest reports
+
+    Returns:
+        A fitted forest holding every tree, with predictions over all classes
+    """
+    merged = copy.copy(forests[0])
+    merged.estimators_ = [estimator for forest in forests for estimator in forest.estimators_]
+    merged.classes_ = np.asarray(classes)
+    merged.n_classes_ = len(classes)
+    merged.n_estimators = len(merged.estimators_)
+    merged.random_state = model.random_state
+    merged.class_weight = model.class_weight
+    merged.n_jobs = model.n_jobs
+    return merged
+
+
+def train_forest_on_shards(shard_paths: List[str], model: RandomForestClassifier,
+                           executor: Optional[Executor] = None, max_workers: Optional[int] = None,
+                           random_state: int = 42) -> RandomForestClassifier:
+    """
+    Train a random forest data-parallel over shard files, one worker per shard.
+
+    Each worker loads only its own shard and trains its share of
+    `model.n_estimators` trees on it. 'balanced' class weights are computed
+    once over the labels of every shard and passed to each worker as sample
+    weights, and every shard's trees are widened to the full class space
+    before the trees are merged into one forest that serves like a
+    single-process one.
+
+    Args:
+        shard_paths: Shard files as written by `write_shards`, readable by every worker
+        model: Unfitted forest whose parameters every shard uses
+        executor: Any concurrent.futures.Executor, e.g. one backed by a cluster;
+            defaults to a local process pool
+        max_workers: Pool size for the default process pool
+        random_state: Seed of the first shard's trees; the others use the following seeds
+
+    Returns:
+        The merged, fitted forest
+    """
+    n_shards = len(shard_paths)
+    if n_shards < 1:
+        raise ValueError("At least one shard is needed")
+    if model.class_weight not in (None, 'balanced'):
+        raise ValueError("class_weight must be None or 'balanced' to train across workers")
+
+    tree_counts = trees_per_shard(model.n_estimators, n_shards)
+    if min(tree_counts) < 1:
+        raise ValueError("n_estimators must be at least the number of shards")
+
+    # Class weights over every row, not per shard
+    classes, class_weights = balanced_class_weights(shard_paths)
+
+    tasks = [{
+        'path': path,
+        'classes': classes,
+        'class_weights': class_weights if model.class_weight else None,
+        'model': model,
+        'n_estimators': tree_counts[shard],
+        'random_state': random_state + shard
+    } for shard, path in enumerate(shard_paths)]
+
+    owns_executor = executor is None
+    if owns_executor:
+        executor = ProcessPoolExecutor(max_workers=max_workers or n_shards)
+    try:
+        forests = list(executor.map(_fit_shard, tasks))
+    finally:
+        if owns_executor:
+            executor.shutdown()
+
+    return merge_forests(forests, classes, model)
+
+
+def train_distributed_forest(X, y, model: RandomForestClassifier, n_shards: int = 4,
+                             executor: Optional[Executor] = None, max_workers: Optional[int] = None,
+                             random_state: int = 42, shard_dir: Optional[str] = None) -> RandomForestClassifier:
+    """
+    Train a random forest data-parallel across worker processes from in-memory data.
+
+    The rows are written to n_shards random partitions with `write_shards`
+    and trained with `train_forest_on_shards`, so each worker only ever holds
+    its own partition.
+
+    Args:
+        X: Feature matrix (array or DataFrame)
+        y: Encoded target labels
+        model: Unfitted forest whose parameters every shard uses
+        n_shards: Number of data partitions
+        executor: Any concurrent.futures.Executor, e.g. one backed by a cluster;
+            defaults to a local process pool
+        max_workers: Pool size for the default process pool
+        random_state: Seed for the partitioning and the per-shard forests
+        shard_dir: Directory for the shard files, shared storage when the
+            executor spans machines; defaults to a temporary directory
+
+    Returns:
+        The merged, fitted forest
+    """
+    if n_shards < 1:
+        raise ValueError("n_shards must be at least 1")
+
+    if shard_dir:
+        os.makedirs(shard_dir, exist_ok=True)
+    with tempfile.TemporaryDirectory(dir=shard_dir) as directory:
+        shard_paths = write_shards(X, y, directory, n_shards, random_state)
+        forest = train_forest_on_shards(shard_paths, model, executor=executor, max_workers=max_workers,
+                                        random_state=random_state)
+
+    if hasattr(X, 'columns'):
+        forest.feature_names_in_ = np.asarray(X.columns, dtype=object)
+    return forest
+
+
+def prediction_agreement(model_a, model_b, X) -> Dict[str, float]:
+    """
+    Compare two models' predicted distributions on the same inputs.
+
+    Returns:
+        Top-1 agreement rate and mean total variation distance between the
+        predicted class distributions (0 means identical)
+    """
+    proba_a = model_a.predict_proba(X)
+    proba_b = model_b.predict_proba(X)
+    return {
+        'top1_agreement': float(np.mean(proba_a.argmax(axis=1) == proba_b.argmax(axis=1))),
+        'mean_total_variation': float(np.mean(0.5 * np.abs(proba_a - proba_b).sum(axis=1)))
+    }
@@ -0,0 +1,91 @@
+from typing import Optional
+
+import numpy as np
+
+from catalog import MovieCatalog, MISSING_GENRE, MISSING_YEAR
+from search_index import title_family
+
+# Release years this far apart are about 1/e as similar
+YEAR_SCALE = 10.0
+# Full movie-to-movie matrices are precomputed up to this catalog size
+# (float32, so 2048 movies take 16 MB); larger catalogs compute pool blocks on demand
+MAX_PRECOMPUTED_MOVIES = 2048
+
+
+class DiversityReranker:
+    """
+    Maximal-marginal-relevance re-ranking over a candidate pool.
+
+    Movie-to-movie similarity combines genre and release year, and title
+    variants of the same family ("3 Idiots" and "3 Idiots (Tamil Dubbed)") are
+    treated as identical. The similarity matrix is computed once when the model
+    loads; for catalogs too large to hold it, the same similarity is computed
+    for just the candidate pool from the precomputed feature columns.
+    """
+
+    def __init__(self, catalog: MovieCatalog):
+        families = {}
+        self.family_codes = np.array(
+            [families.setdefault(title_family(catalog.title(i)), len(families)) for i in range(len(catalog))],
+            dtype=np.int32
+        )
+        self.genre_codes = catalog.genre_codes
+        self.years = catalog.years.astype(np.float32)
+
+        self.similarity: Optional[np.ndarray] = None
+        if len(catalog) <= MAX_PRECOMPUTED_MOVIES:
+            self.similarity = self._pairwise(np.arange(len(catalog)))
+
+    def _pairwise(self, movie_ids: np.ndarray) -> np.ndarray:
+        """Compute the similarity between every pair of the given movies."""
+        genres = self.genre_codes[movie_ids]
+        same_genre = (genres[:, None] == genres[None, :]) & (genres[:, None] != MISSING_GENRE)
+
+        years = self.years[movie_ids]
+        known_year = years != MISSING_YEAR
+        year_closeness = np.exp(-np.abs(years[:, None] - years[None, :]) / YEAR_SCALE)
+        year_closeness *= known_year[:, None] & known_year[None, :]
+
+        similarity = 0.5 * same_genre + 0.5 * year_closeness
+        families = self.family_codes[movie_ids]
+        similarity[families[:, None] == families[None, :]] = 1.0
+        return similarity.astype(np.float32)
+
+    def pool_similarity(self, movie_ids: np.ndarray) -> np.ndarray:
+        """Get the similarity block for a candidate pool."""
+        if self.similarity is not None:
+            return self.similarity[np.ix_(movie_ids, movie_ids)]
+        return self._pairwise(movie_ids)
+
+    def rerank(self, pool: np.ndarray, scores: np.ndarray, k: int, diversity: float) -> np.ndarray:
+        """
+        Pick k movies from a pool, trading relevance against similarity to those already picked.
+
+        Args:
+            pool: Candidate movie class ids, best first
+            scores: Model scores of the candidates
+            k: Number of movies to pick
+            diversity: 0 keeps the relevance order, 1 only minimizes redundancy
+
+        Returns:
+            The picked movie class ids, in pick order
+        """
+        k = min(k, len(pool))
+        if diversity <= 0 or k == 0:
+            return pool[:k]
+
+        relevance = scores / max(float(scores.max()), 1e-12)
+        similarity = self.pool_similarity(pool)
+
+        picked = np.empty(k, dtype=np.intp)
+        available = np.ones(len(pool), dtype=bool)
+        max_similarity = np.zeros(len(pool), dtype=np.float32)
+        for step in range(k):
+            mmr = (1.0 - diversity) * relevance - diversity * max_similarity
+            mmr[~available] = -np.inf
+            best = int(np.argmax(mmr))
+            picked[step] = best
+            available[best] = False
+            np.maximum(max_similarity, similarity[best], out=max_similarity)
+
+        return pool[picked]
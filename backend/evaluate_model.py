@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Offline evaluation of the recommendation model.
+
+This script will:
+1. Score the ranked lists served by /recommendations on the held-out split
+   (precision@k, recall@k, NDCG@k and catalog coverage for every context)
+2. Benchmark training wall time and memory as the dataset grows, each
+   scale factor in its own process
+3. Write a versioned JSON report to the reports/ directory
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, List
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from artifacts import file_sha256
+from memory_report import process_rss_bytes
+from train_model import FEATURE_COLUMNS, build_model, encode_dataset, split_dataset
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+REPORT_VERSION = 1
+CLEANED_DATASET = 'movie_recommendation_dataset_cleaned.csv'
+
+
+def context_ids(X: np.ndarray, num_weather: int, num_days: int) -> np.ndarray:
+    """Flatten (mood, weather, day) codes into one context id per row."""
+    X = np.asarray(X, dtype=np.int64)
+    return (X[:, 0] * num_weather + X[:, 1]) * num_days + X[:, 2]
+
+
+def all_contexts(num_moods: int, num_weather: int, num_days: int) -> np.ndarray:
+    """Build the feature matrix for every (mood, weather, day) context, in context id order."""
+    grid = np.indices((num_moods, num_weather, num_days)).reshape(3, -1).T
+    return grid.astype(np.int64)
+
+
+def ranking_metrics(scores: np.ndarray, relevance: np.ndarray, k: int) -> Dict[str, float]:
+    """
+    Compute top-k ranking metrics for a batch of contexts at once.
+
+    Args:
+        scores: (contexts, movies) ranking scores, higher is better
+        relevance: (contexts, movies) relevance counts from held-out interactions
+        k: Cut-off rank
+
+    Returns:
+        Dictionary of metrics averaged over contexts with at least one relevant movie
+    """
+    num_movies = scores.shape[1]
+    k = min(k, num_movies)
+
+    # Top-k per row without a full sort, then order those k by score
+    top_k = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    order = np.argsort(-np.take_along_axis(scores, top_k, axis=1), axis=1, kind='stable')
+    top_k = np.take_along_axis(top_k, order, axis=1)
+
+    relevant = relevance > 0
+    num_relevant = relevant.sum(axis=1)
+    hits = np.take_along_axis(relevant, top_k, axis=1)
+    num_hits = hits.sum(axis=1)
+
+    discounts = 1.0 / np.log2(np.arange(2, k + 2))
+    dcg = (hits * discounts).sum(axis=1)
+    ideal_hits = np.arange(k)[None, :] < num_relevant[:, None]
+    idcg = (ideal_hits * discounts).sum(axis=1)
+
+    evaluated = num_relevant > 0
+    precision = num_hits[evaluated] / k
+    recall = num_hits[evaluated] / num_relevant[evaluated]
+    ndcg = dcg[evaluated] / idcg[evaluated]
+
+    return {
+        f'precision@{k}': float(precision.mean()) if evaluated.any() else 0.0,
+        f'recall@{k}': float(recall.mean()) if evaluated.any() else 0.0,
+        f'ndcg@{k}': float(ndcg.mean()) if evaluated.any() else 0.0,
+        f'coverage@{k}': float(len(np.unique(top_k)) / num_movies),
+        'contexts_evaluated': int(evaluated.sum())
+    }
+
+
+def evaluate_ranking(model, df: pd.DataFrame, encoders: Dict, k_values: List[int]) -> Dict:
+    """Evaluate the model and a popularity baseline on the held-out split."""
+    num_moods = len(encoders['mood'].classes_)
+    num_weather = len(encoders['weather'].classes_)
+    num_days = len(encoders['day'].classes_)
+    num_movies = len(encoders['movie'].classes_)
+    num_contexts = num_moods * num_weather * num_days
+
+    X = df[FEATURE_COLUMNS]
+    y = df['movie_encoded']
+    X_train, X_test, y_train, y_test = split_dataset(X, y)
+
+    # Held-out relevance matrix: how often each movie was chosen in each context
+    relevance = np.zeros((num_contexts, num_movies), dtype=np.int64)
+    np.add.at(relevance, (context_ids(X_test.values, num_weather, num_days), y_test.values), 1)
+
+    # Score every context in a single predict_proba call
+    contexts = pd.DataFrame(all_contexts(num_moods, num_weather, num_days), columns=FEATURE_COLUMNS)
+    probabilities = model.predict_proba(contexts)
+    model_scores = np.zeros((num_contexts, num_movies))
+    model_scores[:, model.classes_] = probabilities
+
+    # Baseline: rank by overall training popularity, same list for every context
+    popularity = np.bincount(y_train.values, minlength=num_movies).astype(float)
+    baseline_scores = np.broadcast_to(popularity, (num_contexts, num_movies))
+
+    results = {'model': {}, 'popularity_baseline': {}}
+    for k in k_values:
+        results['model'].update(ranking_metrics(model_scores, relevance, k))
+        results['popularity_baseline'].update(ranking_metrics(baseline_scores, relevance, k))
+    return results
+
+
+def _fit_scaled(task: Dict) -> Dict:
+    """Train on a resampled dataset and measure it. Runs in a fresh worker process."""
+    rng = np.random.default_rng(task['seed'])
+    rows = rng.integers(0, len(task['y']), size=len(task['y']) * task['factor'])
+    X_scaled, y_scaled = task['X'][rows], task['y'][rows]
+
+    model = build_model()
+    rss_before = process_rss_bytes()
+    start = time.perf_counter()
+    model.fit(X_scaled, y_scaled)
+    wall_time = time.perf_counter() - start
+
+    peak_rss = max_rss_mb()
+    return {
+        'scale_factor': task['factor'],
+        'rows': int(len(rows)),
+        'wall_time_seconds': round(wall_time, 4),
+        'rows_per_second': round(len(rows) / wall_time, 1),
+        'peak_rss_mb': peak_rss,
+        'fit_rss_growth_mb': (round(peak_rss - rss_before / (1024 * 1024), 2)
+                              if peak_rss is not None and rss_before is not None else None)
+    }
+
+
+def benchmark_training(df: pd.DataFrame, scale_factors: List[int], seed: int = 42) -> List[Dict]:
+    """
+    Measure training wall time and memory as the dataset grows.
+
+    Larger datasets are built by resampling the encoded rows with replacement.
+    Each scale factor trains in its own freshly started process, so memory
+    figures include the native allocations of tree building and do not carry
+    over between factors: `peak_rss_mb` is that process's resident set
+    high-water mark, and `fit_rss_growth_mb` is how far it rose above the
+    resident set just before fitting.
+    """
+    X = df[FEATURE_COLUMNS].values
+    y = df['movie_encoded'].values
+
+    results = []
+    context = multiprocessing.get_context('spawn')
+    for factor in scale_factors:
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            result = executor.submit(_fit_scaled, {'X': X, 'y': y, 'factor': factor, 'seed': seed}).result()
+        results.append(result)
+        print(f"  x{factor}: {result['rows']} rows in {result['wall_time_seconds']:.2f}s, "
+              f"peak RSS {result['peak_rss_mb']} MB (+{result['fit_rss_growth_mb']} MB while fitting)")
+    return results
+
+
+def max_rss_mb():
+    """Get this process's resident memory high-water mark in MB, if the platform reports it."""
+    if resource is None:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS reports bytes
+    divisor = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return round(max_rss / divisor, 2)
+
+
+def write_report(report: Dict, output_dir: str) -> str:
+    """Write the report as JSON, named after its creation time."""
+    os.makedirs(output_dir, exist_ok=True)
+    stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    path = os.path.join(output_dir, f'evaluation_v{REPORT_VERSION}_{stamp}.json')
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    return path
+
+
+def main():
+    """Run the offline evaluation."""
+    parser = argparse.ArgumentParser(description="Offline ranking and training benchmark for the recommender.")
+    parser.add_argument('--dataset', default=CLEANED_DATASET, help="Cleaned CSV produced by train_model.py")
+    parser.add_argument('--model', default='model.pkl', help="Trained model to evaluate")
+    parser.add_argument('--k', default='1,3,5,10', help="Comma separated cut-off ranks")
+    parser.add_argument('--scales', default='1,2,4,8', help="Comma separated dataset growth factors")
+    parser.add_argument('--skip-benchmark', action='store_true', help="Only evaluate ranking quality")
+    parser.add_argument('--output-dir', default='reports', help="Directory for the JSON report")
+    args = parser.parse_args()
+
+    k_values = [int(k) for k in args.k.split(',')]
+    scale_factors = [int(factor) for factor in args.scales.split(',')]
+
+    print("📊 Offline evaluation")
+    print("=" * 50)
+
+    df = pd.read_csv(args.dataset, encoding='utf-8')
+    df, encoders = encode_dataset(df)
+    model = joblib.load(args.model)
+
+    print("\nEvaluating ranking quality on the held-out split...")
+    ranking = evaluate_ranking(model, df, encoders, k_values)
+    for name, metrics in ranking.items():
+        print(f"  {name}:")
+        for metric, value in metrics.items():
+            print(f"    {metric}: {value:.4f}" if isinstance(value, float) else f"    {metric}: {value}")
+
+    training = []
+    if not args.skip_benchmark:
+        print("\nBenchmarking training...")
+        training = benchmark_training(df, scale_factors)
+
+    report = {
+        'report_version': REPORT_VERSION,
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'dataset': {
+            'path': args.dataset,
+            'rows': int(len(df)),
+            'movies': int(len(encoders['movie'].classes_)),
+            'sha256': file_sha256(args.dataset)
+        },
+        'model': {
+            'path': args.model,
+            'sha256': file_sha256(args.model),
+            'params': model.get_params()
+        },
+        'ranking': ranking,
+        'training_benchmark': training
+    }
+    path = write_report(report, args.output_dir)
+    print(f"\n✅ Report written to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Synthetic dataset generator for training and serving stress tests.
+
+Writes CSV files in the same raw format as movie_recommendation_dataset.csv
+(movie_title, mood, weather, day, year, genre, description, with unquoted
+commas in descriptions), streaming in chunks so row counts far beyond memory
+are fine. Movie popularity follows a Zipf-like skew, and each context prefers
+its own ordering of the catalog so a model has something to learn.
+"""
+
+import argparse
+import os
+import time
+from typing import Dict, List
+
+import numpy as np
+
+HEADER = 'movie_title,mood,weather,day,year,genre,description\n'
+
+BASE_MOODS = ['Happy', 'Relaxed', 'Melancholic', 'Romantic', 'Excited', 'Adventurous']
+BASE_WEATHER = ['Sunny', 'Rainy', 'Cloudy', 'Snowy']
+BASE_DAYS = ['Weekday', 'Weekend']
+EXTRA_MOODS = ['Nostalgic', 'Curious', 'Tired', 'Inspired', 'Anxious', 'Playful']
+EXTRA_WEATHER = ['Windy', 'Foggy', 'Stormy', 'Humid', 'Hazy']
+EXTRA_DAYS = ['Holiday', 'Festival']
+GENRES = ['Bollywood', 'Hollywood']
+
+DESCRIPTION_SUBJECTS = ['A young dreamer', 'Two estranged siblings', 'A retired detective', 'A small-town teacher',
+                        'An ambitious chef', 'A band of misfits', 'A reluctant hero', 'A grieving widow']
+DESCRIPTION_ACTIONS = ['sets out on a journey', 'uncovers a family secret', 'fights for a second chance',
+                       'falls in love unexpectedly', 'takes on a powerful rival', 'returns home after years']
+DESCRIPTION_ENDINGS = ['changing everything they believed.', 'with help from an unlikely friend.',
+                       'against all odds.', 'and learns what really matters.', 'during one unforgettable summer.']
+
+# Sizes referenced by benchmarks and scale tests
+PRESETS: Dict[str, Dict] = {
+    'tiny': {'rows': 1_000, 'movies': 100},
+    'small': {'rows': 100_000, 'movies': 1_000},
+    'medium': {'rows': 10_000_000, 'movies': 10_000, 'extra_moods': 2, 'extra_weather': 1},
+    'large': {'rows': 100_000_000, 'movies': 100_000, 'extra_moods': 4, 'extra_weather': 3, 'extra_days': 1},
+    'xlarge': {'rows': 1_000_000_000, 'movies': 500_000, 'extra_moods': 6, 'extra_weather': 5, 'extra_days': 2},
+}
+
+
+def context_values(base: List[str], extras: List[str], count: int, prefix: str) -> List[str]:
+    """Get the base values plus `count` extra ones, numbering them once the named extras run out."""
+    values = base + extras[:count]
+    values += [f'{prefix}{i}' for i in range(len(values) - len(base), count)]
+    return values
+
+
+def build_catalog(num_movies: int, variant_rate: float, rng: np.random.Generator) -> Dict[str, np.ndarray]:
+    """
+    Create the synthetic movies as precomputed row fragments.
+
+    Returns:
+        Object arrays of "title," heads and "year,genre,description" tails,
+        indexed by movie id
+    """
+    heads = []
+    tails = []
+    years = rng.integers(1950, 2025, size=num_movies)
+    genres = rng.integers(0, len(GENRES), size=num_movies)
+    subjects = rng.integers(0, len(DESCRIPTION_SUBJECTS), size=num_movies)
+    actions = rng.integers(0, len(DESCRIPTION_ACTIONS), size=num_movies)
+    endings = rng.integers(0, len(DESCRIPTION_ENDINGS), size=num_movies)
+    variants = rng.random(num_movies) < variant_rate
+
+    for movie_id in range(num_movies):
+        # Variants repeat the previous title with a suffix, like "3 Idiots (Tamil Dubbed)"
+        if variants[movie_id] and movie_id > 0:
+            title = f'Synthetic Movie {movie_id - 1} (Dubbed)'
+        else:
+            title = f'Synthetic Movie {movie_id}'
+        description = (f'{DESCRIPTION_SUBJECTS[subjects[movie_id]]} {DESCRIPTION_ACTIONS[actions[movie_id]]}, '
+                       f'{DESCRIPTION_ENDINGS[endings[movie_id]]}')
+        heads.append(f'{title},')
+        tails.append(f'{years[movie_id]},{GENRES[genres[movie_id]]},{description}\n')
+
+    return {
+        'heads': np.array(heads, dtype=object),
+        'tails': np.array(tails, dtype=object)
+    }
+
+
+def popularity_cdf(num_movies: int, skew: float) -> np.ndarray:
+    """Cumulative distribution over popularity ranks; skew 0 is uniform, higher is more concentrated."""
+    weights = 1.0 / np.arange(1, num_movies + 1) ** skew
+    cdf = np.cumsum(weights)
+    return cdf / cdf[-1]
+
+
+def context_permutations(num_contexts: int, num_movies: int, rng: np.random.Generator) -> np.ndarray:
+    """
+    Get an affine permutation (a, b) per context, so rank r maps to movie (a * r + b) % num_movies.
+
+    This gives every context its own favourite movies without storing a full
+    permutation per context.
+    """
+    multipliers = rng.integers(1, max(num_movies, 2), size=num_contexts)
+    # Multipliers must be coprime with the catalog size to form a permutation
+    for i in range(num_contexts):
+        while np.gcd(multipliers[i], num_movies) != 1:
+            multipliers[i] = (multipliers[i] % num_movies) + 1
+    offsets = rng.integers(0, num_movies, size=num_contexts)
+    return np.stack([multipliers, offsets], axis=1)
+
+
+def malformed_rows(heads: np.ndarray, contexts: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    """Build deliberately broken rows: truncated, missing fields or a non-numeric year."""
+    kinds = rng.integers(0, 4, size=len(heads))
+    rows = np.empty(len(heads), dtype=object)
+    for i, (head, context, kind) in enumerate(zip(heads, contexts, kinds)):
+        mood, weather, day = context.rstrip(',').split(',')
+        if kind == 0:
+            rows[i] = f'{head}{mood}\n'
+        elif kind == 1:
+            rows[i] = f'{head},{weather},{day},2001,Bollywood,Missing mood.\n'
+        elif kind == 2:
+            rows[i] = f',{mood},{weather},{day},2001,Bollywood,Missing title.\n'
+        else:
+            rows[i] = f'{head}{context}unknown,Bollywood,Bad year.\n'
+    return rows
+
+
+def generate_dataset(output_path: str, rows: int, movies: int, extra_moods: int = 0, extra_weather: int = 0,
+                     extra_days: int = 0, skew: float = 1.0, context_strength: float = 0.7,
+                     malformed_rate: float = 0.0, variant_rate: float = 0.02, chunk_size: int = 1_000_000,
+                     seed: int = 42) -> Dict:
+    """
+    Stream a synthetic dataset to a CSV file.
+
+    Args:
+        output_path: CSV file to write
+        rows: Number of data rows
+        movies: Catalog size
+        extra_moods, extra_weather, extra_days: Context values added to the real ones
+        skew: Zipf exponent of movie popularity
+        context_strength: Share of rows drawn from the context's own ordering
+            rather than the global one
+        malformed_rate: Share of rows written deliberately broken
+        variant_rate: Share of movies that are a suffixed variant of the previous title
+        chunk_size: Rows generated and written per chunk
+        seed: Random seed
+
+    Returns:
+        Summary of what was written
+    """
+    rng = np.random.default_rng(seed)
+    moods = context_values(BASE_MOODS, EXTRA_MOODS, extra_moods, 'Mood')
+    weather = context_values(BASE_WEATHER, EXTRA_WEATHER, extra_weather, 'Weather')
+    days = context_values(BASE_DAYS, EXTRA_DAYS, extra_days, 'Day')
+    contexts = np.array([f'{m},{w},{d},' for m in moods for w in weather for d in days], dtype=object)
+
+    catalog = build_catalog(movies, variant_rate, rng)
+    cdf = popularity_cdf(movies, skew)
+    permutations = context_permutations(len(contexts), movies, rng)
+
+    written = 0
+    malformed = 0
+    start = time.perf_counter()
+    with open(output_path, 'w', encoding='utf-8', newline='') as f:
+        f.write(HEADER)
+        while written < rows:
+            size = min(chunk_size, rows - written)
+            context_ids = rng.integers(0, len(contexts), size=size)
+            ranks = np.minimum(np.searchsorted(cdf, rng.random(size)), movies - 1)
+
+            # Rank -> movie, through the context's own ordering for most rows
+            own_ordering = rng.random(size) < context_strength
+            multipliers, offsets = permutations[context_ids, 0], permutations[context_ids, 1]
+            movie_ids = np.where(own_ordering, (ranks * multipliers + offsets) % movies, ranks)
+
+            lines = catalog['heads'][movie_ids] + contexts[context_ids] + catalog['tails'][movie_ids]
+            if malformed_rate > 0:
+                broken = np.flatnonzero(rng.random(size) < malformed_rate)
+                lines[broken] = malformed_rows(catalog['heads'][movie_ids[broken]], contexts[context_ids[broken]], rng)
+                malformed += len(broken)
+
+            f.write(''.join(lines.tolist()))
+            written += size
+            print(f"  {written:,}/{rows:,} rows ({written / (time.perf_counter() - start):,.0f} rows/s)")
+
+    return {
+        'path': output_path,
+        'rows': written,
+        'malformed_rows': malformed,
+        'movies': movies,
+        'moods': len(moods),
+        'weather': len(weather),
+        'days': len(days),
+        'bytes': os.path.getsize(output_path),
+        'seconds': round(time.perf_counter() - start, 2)
+    }
+
+
+def main():
+    """Generate a dataset from a preset and/or explicit options."""
+    parser = argparse.ArgumentParser(description="Generate a synthetic movie recommendation dataset.")
+    parser.add_argument('--preset', choices=sorted(PRESETS), help="Named size; explicit options override it")
+    parser.add_argument('--output', default=None, help="Output CSV (default: synthetic_<preset or rows>.csv)")
+    parser.add_argument('--rows', type=int, help="Number of data rows")
+    parser.add_argument('--movies', type=int, help="Catalog size")
+    parser.add_argument('--extra-moods', type=int, help="Extra mood values beyond the real six")
+    parser.add_argument('--extra-weather', type=int, help="Extra weather values beyond the real four")
+    parser.add_argument('--extra-days', type=int, help="Extra day values beyond Weekday/Weekend")
+    parser.add_argument('--skew', type=float, help="Zipf exponent of movie popularity (0 is uniform)")
+    parser.add_argument('--context-strength', type=float, help="Share of rows following their context's ordering")
+    parser.add_argument('--malformed-rate', type=float, help="Share of deliberately broken rows")
+    parser.add_argument('--variant-rate', type=float, help="Share of movies that are title variants")
+    parser.add_argument('--chunk-size', type=int, help="Rows per write chunk")
+    parser.add_argument('--seed', type=int, help="Random seed")
+    args = parser.parse_args()
+
+    options = dict(PRESETS[args.preset]) if args.preset else {}
+    for name in ('rows', 'movies', 'extra_moods', 'extra_weather', 'extra_days', 'skew', 'context_strength',
+                 'malformed_rate', 'variant_rate', 'chunk_size', 'seed'):
+        value = getattr(args, name)
+        if value is not None:
+            options[name] = value
+    if 'rows' not in options or 'movies' not in options:
+        parser.error("either --preset or both --rows and --movies are required")
+
+    output = args.output or f"synthetic_{args.preset or options['rows']}.csv"
+    print(f"🎲 Generating {options['rows']:,} rows over {options['movies']:,} movies into {output}")
+    summary = generate_dataset(output, **options)
+    print(f"✅ Done: {summary}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+import os
+import sys
+from typing import Optional
+
+import numpy as np
+
+
+def deep_sizeof(obj, seen: Optional[set] = None) -> int:
+    """
+    Estimate the memory held by an object and everything it references.
+
+    Follows containers, object arrays and instance attributes; objects shared
+    between components are only counted once per call.
+    """
+    if seen is None:
+        seen = set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+
+    if isinstance(obj, np.ndarray):
+        size = sys.getsizeof(obj)
+        if obj.dtype == object:
+            size += sum(deep_sizeof(item, seen) for item in obj.ravel())
+        return size
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, (str, bytes, bytearray, int, float, bool)) or obj is None:
+        return size
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(key, seen) + deep_sizeof(value, seen) for key, value in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_sizeof(item, seen) for item in obj)
+    elif hasattr(obj, '__dict__'):
+        size += deep_sizeof(vars(obj), seen)
+    return size
+
+
+def process_rss_bytes() -> Optional[int]:
+    """Get the current resident set size of this process, if the platform reports it."""
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+def model_sizeof(model) -> int:
+    """
+    Estimate the memory held by a fitted tree ensemble.
+
+    Tree nodes live in native arrays that `sys.getsizeof` cannot see, so they
+    are measured through each tree's pickled state; other models fall back to
+    `deep_sizeof`.
+    """
+    estimators = getattr(model, 'estimators_', None)
+    if not estimators:
+        return deep_sizeof(model)
+
+    size = sys.getsizeof(model)
+    for estimator in estimators:
+        state = estimator.tree_.__getstate__()
+        size += state['nodes'].nbytes + state['values'].nbytes
+    return size
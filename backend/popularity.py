@@ -0,0 +1,232 @@
+import hashlib
+import json
+import math
+import os
+import threading
+import time
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+# Counts lose half their weight after this many seconds
+DEFAULT_HALF_LIFE = 6 * 3600.0
+# Counts are rebased once the forward-decay scale grows past this, well inside float32 range
+MAX_SCALE = 1e12
+# Longest the background thread sleeps between rebase checks
+MAX_MAINTENANCE_INTERVAL = 60.0
+# Every movie's accept rate starts from this many decayed serves without an accept,
+# so a handful of picks cannot outweigh the model
+PRIOR_SERVES = 20.0
+
+
+def counters_fingerprint(movie_titles: Sequence[str], context_values: Sequence[Sequence[str]]) -> str:
+    """Get a checksum identifying the movie ids and context ids that counters are indexed by."""
+    layout = [[str(title) for title in movie_titles]] + [[str(value) for value in values] for values in context_values]
+    return hashlib.sha256(json.dumps(layout, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+class CounterEpoch:
+    """Serve and accept counters together with the forward-decay landmark their weights are relative to."""
+
+    def __init__(self, landmark: float, serves: np.ndarray, accepts: np.ndarray, accept_totals: np.ndarray):
+        self.landmark = landmark
+        self.serves = serves
+        self.accepts = accepts
+        self.accept_totals = accept_totals
+
+    @property
+    def nbytes(self) -> int:
+        """Get the size of the counter arrays."""
+        return self.serves.nbytes + self.accepts.nbytes + self.accept_totals.nbytes
+
+
+class PopularityTracker:
+    """
+    Time-decayed serve and accept counters per (context, movie).
+
+    Counters live in preallocated float32 arrays of shape
+    (num_contexts, num_movies), indexed by the encoded mood/weather/day
+    context and the movie class id. Decay uses forward decay: an event at
+    time t adds exp((t - landmark) / tau) instead of 1, so nothing has to be
+    decayed on the request path, and dividing by the current scale gives the
+    decayed counts.
+
+    Updates take no lock. Under heavy contention two threads can occasionally
+    race on the same cell and one increment is lost, which is harmless for a
+    popularity signal and keeps recording to a few microseconds. The arrays
+    and their landmark are held together in one CounterEpoch, and every
+    update and read works on a single epoch, so weights from two landmarks
+    are never mixed. A background thread rebases: once the weight passes
+    MAX_SCALE it builds rescaled copies against a new landmark and swaps the
+    epoch reference, whether or not snapshots are enabled. Increments that
+    land on the old epoch during the swap are lost like any other race. The
+    same thread writes the counters to disk every `snapshot_interval`
+    seconds, and they are restored on the next start if they were recorded
+    for the same `fingerprint`.
+    """
+
+    def __init__(self, num_contexts: int, num_movies: int, half_life: float = DEFAULT_HALF_LIFE,
+                 snapshot_path: Optional[str] = 'popularity.npz', snapshot_interval: float = 60.0,
+                 fingerprint: str = ''):
+        self.num_contexts = num_contexts
+        self.num_movies = num_movies
+        self.tau = half_life / math.log(2)
+        self.snapshot_path = snapshot_path
+        self.snapshot_interval = snapshot_interval
+        self.fingerprint = fingerprint
+
+        self.counters = CounterEpoch(
+            landmark=time.time(),
+            serves=np.zeros((num_contexts, num_movies), dtype=np.float32),
+            accepts=np.zeros((num_contexts, num_movies), dtype=np.float32),
+            accept_totals=np.zeros(num_contexts, dtype=np.float64)
+        )
+        # Only serializes rebases and snapshots against each other, never taken on the request path
+        self._maintenance_lock = threading.Lock()
+
+        if snapshot_path and os.path.exists(snapshot_path):
+            self.load_snapshot()
+
+        self._snapshots_enabled = bool(snapshot_path) and snapshot_interval > 0
+        intervals = [half_life, MAX_MAINTENANCE_INTERVAL] + ([snapshot_interval] if self._snapshots_enabled else [])
+        self._maintenance_interval = min(intervals)
+        self._stop = threading.Event()
+        self._maintenance_thread = threading.Thread(target=self._maintenance_loop, name='popularity-maintenance',
+                                                    daemon=True)
+        self._maintenance_thread.start()
+
+    def _scale(self, counters: CounterEpoch) -> float:
+        """Get the forward-decay weight of an event happening now, relative to an epoch's landmark."""
+        return math.exp((time.time() - counters.landmark) / self.tau)
+
+    def record_serves(self, context_id: int, movie_ids: np.ndarray):
+        """Count movies shown to a user in a context."""
+        counters = self.counters
+        counters.serves[context_id, movie_ids] += self._scale(counters)
+
+    def record_accept(self, context_id: int, movie_id: int):
+        """Count a movie a user picked in a context."""
+        counters = self.counters
+        weight = self._scale(counters)
+        counters.accepts[context_id, movie_id] += weight
+        counters.accept_totals[context_id] += weight
+
+    def popularity(self, context_id: int) -> np.ndarray:
+        """
+        Get the smoothed decayed accept rate of every movie in a context.
+
+        Each movie's rate is accepts / (serves + PRIOR_SERVES), with an accept
+        counting as a serve if the movie was picked more often than it was
+        counted as served.
+
+        Returns:
+            Accept rate per movie, between 0 and 1
+        """
+        counters = self.counters
+        prior = np.float32(PRIOR_SERVES * self._scale(counters))
+        accepts = counters.accepts[context_id]
+        return accepts / (np.maximum(counters.serves[context_id], accepts) + prior)
+
+    def blend(self, context_id: int, probabilities: np.ndarray, weight: float) -> np.ndarray:
+        """
+        Mix a context's accept rates into model probabilities: (1 - weight) * p + weight * popularity.
+
+        Only movies with accepts have a non-zero rate, so only those are computed.
+        """
+        counters = self.counters
+        if weight <= 0 or counters.accept_totals[context_id] <= 0:
+            return probabilities
+        accepted = np.flatnonzero(counters.accepts[context_id] > 0)
+        accepts = counters.accepts[context_id, accepted]
+        prior = np.float32(PRIOR_SERVES * self._scale(counters))
+        blended = (1.0 - weight) * probabilities
+        blended[accepted] += weight * accepts / (np.maximum(counters.serves[context_id, accepted], accepts) + prior)
+        return blended
+
+    def rebase(self, force: bool = False) -> bool:
+        """
+        Swap in counters re-expressed against a landmark of now, if the weight has passed MAX_SCALE.
+
+        Returns:
+            True if the counters were rebased
+        """
+        with self._maintenance_lock:
+            counters = self.counters
+            now = time.time()
+            if not force and (now - counters.landmark) / self.tau <= math.log(MAX_SCALE):
+                return False
+            factor = math.exp(-(now - counters.landmark) / self.tau)
+            self.counters = CounterEpoch(
+                landmark=now,
+                serves=counters.serves * np.float32(factor),
+                accepts=counters.accepts * np.float32(factor),
+                accept_totals=counters.accept_totals * factor
+            )
+            return True
+
+    def save_snapshot(self):
+        """Write the decayed counters to disk, replacing the previous snapshot atomically."""
+        with self._maintenance_lock:
+            counters = self.counters
+            temp_path = f'{self.snapshot_path}.tmp'
+            with open(temp_path, 'wb') as f:
+                np.savez(f, landmark=counters.landmark, tau=self.tau, fingerprint=self.fingerprint,
+                         serves=counters.serves, accepts=counters.accepts, accept_totals=counters.accept_totals)
+            os.replace(temp_path, self.snapshot_path)
+
+    def load_snapshot(self) -> bool:
+        """
+        Restore counters from disk, re-expressed against a fresh landmark.
+
+        Returns:
+            True if the snapshot matched the current contexts and catalog and was restored
+        """
+        try:
+            with np.load(self.snapshot_path) as snapshot:
+                if ('fingerprint' not in snapshot or str(snapshot['fingerprint']) != self.fingerprint
+                        or snapshot['serves'].shape != self.counters.serves.shape):
+                    print(f"Ignoring popularity snapshot {self.snapshot_path}: catalog or contexts changed")
+                    return False
+                now = time.time()
+                factor = math.exp(-(now - float(snapshot['landmark'])) / float(snapshot['tau']))
+                self.counters = CounterEpoch(
+                    landmark=now,
+                    serves=(snapshot['serves'] * factor).astype(np.float32),
+                    accepts=(snapshot['accepts'] * factor).astype(np.float32),
+                    accept_totals=snapshot['accept_totals'] * factor
+                )
+                return True
+        except Exception as e:
+            print(f"Error loading popularity snapshot {self.snapshot_path}: {e!r}")
+            return False
+
+    def _maintenance_loop(self):
+        """Rebase when due and periodically save snapshots until stopped."""
+        next_snapshot = time.monotonic() + self.snapshot_interval
+        while not self._stop.wait(self._maintenance_interval):
+            try:
+                self.rebase()
+                if self._snapshots_enabled and time.monotonic() >= next_snapshot:
+                    next_snapshot = time.monotonic() + self.snapshot_interval
+                    self.save_snapshot()
+            except Exception as e:
+                print(f"Error maintaining popularity counters: {e!r}")
+
+    def close(self):
+        """Stop the background thread and write a final snapshot."""
+        self._stop.set()
+        self._maintenance_thread.join()
+        if self._snapshots_enabled:
+            self.save_snapshot()
+
+    def get_stats(self) -> Dict:
+        """Get the decayed serve and accept totals and the snapshot settings."""
+        counters = self.counters
+        scale = self._scale(counters)
+        return {
+            'decayed_serves': round(float(counters.serves.sum(dtype=np.float64)) / scale, 2),
+            'decayed_accepts': round(float(counters.accept_totals.sum()) / scale, 2),
+            'half_life_seconds': round(self.tau * math.log(2), 1),
+            'snapshot_path': self.snapshot_path,
+            'snapshot_interval_seconds': self.snapshot_interval
+        }
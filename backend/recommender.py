@@ -1,8 +1,21 @@
 import joblib
 import json
+import os
 import numpy as np
 from typing import Dict, List, Optional
 
+from artifacts import ArtifactError, MANIFEST_FILE, candidate_directories, promote_known_good, verify_artifacts
+from catalog import MovieCatalog
+from diversity import DiversityReranker
+from memory_report import deep_sizeof, model_sizeof, process_rss_bytes
+from popularity import DEFAULT_HALF_LIFE, PopularityTracker, counters_fingerprint
+from ranking import ShardedRanker
+from search_index import SearchIndex
+from seen_store import SeenHistoryStore
+
+# Candidates considered when diversifying recommendations
+DIVERSITY_POOL_SIZE = 200
+
 class MovieRecommender:
     """
     Movie recommendation system using trained ML model.
@@ -14,33 +27,107 @@ class MovieRecommender:
         self.weather_encoder = None
         self.day_encoder = None
         self.movie_encoder = None
-        self.movie_metadata = None
+        self.catalog = None
         self.encoder_mappings = None
+        self.search_index = None
+        self.diversity_reranker = None
+        self.movie_ids = None
+        self.artifact_directory = None
         self.load_model()
+        self.seen_store = SeenHistoryStore(titles=self.movie_encoder.classes_)
+        # Split top-k ranking across threads for very large catalogs
+        self.ranker = ShardedRanker(num_shards=int(os.environ.get('RANKING_SHARDS', '1')))
+        # Decayed serve/accept counters per context, blended into rankings on request
+        self.popularity = PopularityTracker(
+            num_contexts=len(self.mood_encoder.classes_) * len(self.weather_encoder.classes_)
+                         * len(self.day_encoder.classes_),
+            num_movies=len(self.catalog),
+            half_life=float(os.environ.get('POPULARITY_HALF_LIFE', str(DEFAULT_HALF_LIFE))),
+            snapshot_interval=float(os.environ.get('POPULARITY_SNAPSHOT_INTERVAL', '60')),
+            fingerprint=counters_fingerprint(self.movie_encoder.classes_,
+                                             [self.mood_encoder.classes_, self.weather_encoder.classes_,
+                                              self.day_encoder.classes_])
+        )
     
-    def load_model(self):
-        """Load the trained model and encoders."""
-        try:
-            self.model = joblib.load('model.pkl')
-            self.mood_encoder = joblib.load('mood_encoder.pkl')
-            self.weather_encoder = joblib.load('weather_encoder.pkl')
-            self.day_encoder = joblib.load('day_encoder.pkl')
-            self.movie_encoder = joblib.load('movie_encoder.pkl')
-            
-            # Load movie metadata
-            with open('movie_metadata.json', 'r') as f:
-                self.movie_metadata = json.load(f)
-            
-            # Load encoder mappings
-            with open('encoder_mappings.json', 'r') as f:
-                self.encoder_mappings = json.load(f)
-                
-            print("Model and encoders loaded successfully!")
+    def load_model(self, root: str = '.'):
+        """
+        Load the trained model and encoders, falling back to the last known-good set.
+        
+        The working artifact set is verified against its checksum manifest
+        first. If it is corrupt, incomplete or fails to load, the last set that
+        verified and loaded is used instead, so an interrupted training run
+        never takes the service down. A working set that loads becomes the new
+        known-good set.
+        """
+        errors = []
+        for directory in candidate_directories(root):
+            problems = verify_artifacts(directory)
+            unverified = problems == [f"no {MANIFEST_FILE} in {directory}"] and directory == root
+            if problems and not unverified:
+                errors.append(f"{directory}: {'; '.join(problems)}")
+                print(f"Skipping artifacts in {directory}: {'; '.join(problems)}")
+                continue
+            if unverified:
+                print(f"Warning: no {MANIFEST_FILE}, loading artifacts without integrity checks")
             
-        except FileNotFoundError as e:
-            print(f"Error loading model files: {e}")
-            print("Please run train_model.py first to train the model.")
-            raise
+            try:
+                self._load_artifacts(directory)
+            except Exception as e:
+                errors.append(f"{directory}: {e!r}")
+                print(f"Error loading artifacts from {directory}: {e!r}")
+                continue
+            
+            if directory == root and not unverified:
+                try:
+                    promote_known_good(directory, root)
+                except OSError as e:
+                    print(f"Could not save known-good artifact copy: {e!r}")
+            elif directory != root:
+                print(f"Serving the last known-good artifacts from {directory}")
+            self.artifact_directory = directory
+            print("Model and encoders loaded successfully!")
+            return
+        
+        print("Please run train_model.py first to train the model.")
+        raise ArtifactError(f"No loadable model artifacts: {' | '.join(errors)}")
+    
+    def _load_artifacts(self, directory: str):
+        """Load one artifact set and build everything derived from it."""
+        model = joblib.load(os.path.join(directory, 'model.pkl'))
+        mood_encoder = joblib.load(os.path.join(directory, 'mood_encoder.pkl'))
+        weather_encoder = joblib.load(os.path.join(directory, 'weather_encoder.pkl'))
+        day_encoder = joblib.load(os.path.join(directory, 'day_encoder.pkl'))
+        movie_encoder = joblib.load(os.path.join(directory, 'movie_encoder.pkl'))
+        
+        # Load movie metadata into a columnar catalog ordered by class id
+        with open(os.path.join(directory, 'movie_metadata.json'), 'r') as f:
+            catalog = MovieCatalog(movie_encoder.classes_, json.load(f))
+        
+        # Load encoder mappings; movie titles are already in movie_encoder
+        with open(os.path.join(directory, 'encoder_mappings.json'), 'r') as f:
+            encoder_mappings = json.load(f)
+        encoder_mappings.pop('movies', None)
+        
+        # Catch sets whose pieces do not belong together
+        if len(model.classes_) != len(movie_encoder.classes_):
+            raise ArtifactError("model classes do not match movie_encoder.pkl")
+        
+        self.model = model
+        self.mood_encoder = mood_encoder
+        self.weather_encoder = weather_encoder
+        self.day_encoder = day_encoder
+        self.movie_encoder = movie_encoder
+        self.catalog = catalog
+        self.encoder_mappings = encoder_mappings
+        
+        # Map movie titles to their class ids
+        self.movie_ids = {title: i for i, title in enumerate(self.movie_encoder.classes_)}
+        
+        # Build the title/description search index
+        self.search_index = SearchIndex(self.catalog)
+        
+        # Precompute movie-to-movie similarity for diversified recommendations
+        self.diversity_reranker = DiversityReranker(self.catalog)
     
     def get_available_options(self) -> Dict[str, List[str]]:
         """Get available options for mood, weather, and day."""
@@ -50,7 +137,151 @@ class MovieRecommender:
             'days': list(self.encoder_mappings['day'].values())
         }
     
-    def recommend_movie(self, mood: str, weather: str, day: str) -> Dict:
+    def build_snapshot(self, num_recommendations: int = 10) -> Dict:
+        """
+        Rank movies for every mood/weather/day context at once.
+        
+        Args:
+            num_recommendations: Length of the ranked list kept per context
+            
+        Returns:
+            Dictionary with the available options, the catalog as parallel
+            columns and, per "mood|weather|day" key, the top movie class ids
+            with their confidences, in the same order /recommendations uses
+        """
+        moods = self.mood_encoder.classes_
+        weather = self.weather_encoder.classes_
+        days = self.day_encoder.classes_
+        
+        # Every context as one feature matrix, scored in a single call
+        contexts = np.indices((len(moods), len(weather), len(days))).reshape(3, -1).T
+        probabilities = self.model.predict_proba(contexts)
+        top_indices = np.array([self.ranker.top_k(row, num_recommendations) for row in probabilities])
+        top_confidences = np.take_along_axis(probabilities, top_indices, axis=1)
+        
+        rankings = {}
+        for row, (mood_id, weather_id, day_id) in enumerate(contexts):
+            key = f"{moods[mood_id]}|{weather[weather_id]}|{days[day_id]}"
+            rankings[key] = {
+                'ids': top_indices[row].tolist(),
+                'confidences': np.round(top_confidences[row], 4).tolist()
+            }
+        
+        return {
+            'options': self.get_available_options(),
+            'num_recommendations': int(top_indices.shape[1]),
+            'movies': self.catalog.to_columns(),
+            'rankings': rankings
+        }
+    
+    def get_memory_report(self) -> Dict:
+        """
+        Estimate the memory held by each loaded component.
+        
+        Returns:
+            Dictionary of byte counts per component, the catalog broken down
+            per column, and the process resident set size
+        """
+        catalog_columns = self.catalog.get_memory_usage()
+        components = {
+            'model': model_sizeof(self.model),
+            'encoders': deep_sizeof([self.mood_encoder, self.weather_encoder, self.day_encoder, self.movie_encoder]),
+            'catalog': sum(catalog_columns.values()),
+            'movie_ids': deep_sizeof(self.movie_ids),
+            'encoder_mappings': deep_sizeof(self.encoder_mappings),
+            'search_index': deep_sizeof([self.search_index.postings, self.search_index.vocabulary,
+                                         self.search_index.families, self.search_index.family_codes,
+                                         self.search_index.family_members, self.search_index.dense_weights,
+                                         self.search_index.prefix_top, self.search_index.pair_top]),
+            'diversity_similarity': deep_sizeof([self.diversity_reranker.similarity,
+                                                 self.diversity_reranker.family_codes]),
+            'popularity_counters': self.popularity.counters.nbytes,
+            'seen_history_cache': self.seen_store.get_memory_usage()
+        }
+        return {
+            'components': components,
+            'catalog_columns': catalog_columns,
+            'total_components': sum(components.values()),
+            'process_rss': process_rss_bytes()
+        }
+    
+    def search_movies(self, query: str, limit: int = 10) -> List[Dict]:
+        """
+        Search movies by title and description.
+        
+        Args:
+            query: Search text, the last word may be a prefix
+            limit: Maximum number of results to return
+            
+        Returns:
+            List of matching movies, ranked, with title variants grouped
+        """
+        return self.search_index.search(query, limit)
+    
+    def mark_seen(self, user_id: str, movie_titles: List[str]) -> int:
+        """
+        Record movies a user has already seen so they are excluded from their recommendations.
+        
+        Args:
+            user_id: User identifier
+            movie_titles: Titles the user has seen
+            
+        Returns:
+            Total number of movies in the user's seen history
+        """
+        unknown = [title for title in movie_titles if title not in self.movie_ids]
+        if unknown:
+            raise ValueError(f"Unknown movies: {unknown}")
+        
+        return self.seen_store.mark_seen(user_id, [self.movie_ids[title] for title in movie_titles])
+    
+    def _validate_inputs(self, mood: str, weather: str, day: str):
+        """Raise ValueError if mood, weather or day is not a known option."""
+        if mood not in self.encoder_mappings['mood'].values():
+            raise ValueError(f"Invalid mood: {mood}. Available moods: {list(self.encoder_mappings['mood'].values())}")
+        
+        if weather not in self.encoder_mappings['weather'].values():
+            raise ValueError(f"Invalid weather: {weather}. Available weather: {list(self.encoder_mappings['weather'].values())}")
+        
+        if day not in self.encoder_mappings['day'].values():
+            raise ValueError(f"Invalid day: {day}. Available days: {list(self.encoder_mappings['day'].values())}")
+    
+    def _context_id(self, mood_encoded: int, weather_encoded: int, day_encoded: int) -> int:
+        """Get the row of an encoded mood/weather/day context in the popularity counters."""
+        return int((mood_encoded * len(self.weather_encoder.classes_) + weather_encoded)
+                   * len(self.day_encoder.classes_) + day_encoded)
+    
+    def record_accept(self, mood: str, weather: str, day: str, movie_title: str):
+        """
+        Record that a user picked a recommended movie in a context.
+        
+        Args:
+            mood: User's mood
+            weather: Current weather
+            day: Day type
+            movie_title: Title of the picked movie
+        """
+        self._validate_inputs(mood, weather, day)
+        if movie_title not in self.movie_ids:
+            raise ValueError(f"Unknown movie: {movie_title}")
+        
+        context_id = self._context_id(self.mood_encoder.transform([mood])[0],
+                                      self.weather_encoder.transform([weather])[0],
+                                      self.day_encoder.transform([day])[0])
+        self.popularity.record_accept(context_id, self.movie_ids[movie_title])
+    
+    def _exclude_seen(self, probabilities: np.ndarray, user_id: Optional[str]) -> np.ndarray:
+        """Push movies the user has seen to the bottom of the ranking."""
+        if user_id is None:
+            return probabilities
+        
+        seen = self.seen_store.get_mask(user_id, len(probabilities))
+        if seen is None or seen.all():
+            return probabilities
+        
+        return np.where(seen, -1.0, probabilities)
+    
+    def recommend_movie(self, mood: str, weather: str, day: str, user_id: Optional[str] = None) -> Dict:
         """
         Recommend a movie based on mood, weather, and day.
         
@@ -58,20 +289,14 @@ class MovieRecommender:
             mood: User's mood (e.g., 'Happy', 'Relaxed', 'Melancholic')
             weather: Current weather (e.g., 'Sunny', 'Rainy', 'Cloudy', 'Snowy')
             day: Day type (e.g., 'Weekday', 'Weekend')
+            user_id: Optional user whose seen movies should be skipped
             
         Returns:
             Dictionary containing recommended movie information
         """
         try:
             # Validate inputs
-            if mood not in self.encoder_mappings['mood'].values():
-                raise ValueError(f"Invalid mood: {mood}. Available moods: {list(self.encoder_mappings['mood'].values())}")
-            
-            if weather not in self.encoder_mappings['weather'].values():
-                raise ValueError(f"Invalid weather: {weather}. Available weather: {list(self.encoder_mappings['weather'].values())}")
-            
-            if day not in self.encoder_mappings['day'].values():
-                raise ValueError(f"Invalid day: {day}. Available days: {list(self.encoder_mappings['day'].values())}")
+            self._validate_inputs(mood, weather, day)
             
             # Encode inputs
             mood_encoded = self.mood_encoder.transform([mood])[0]
@@ -82,25 +307,29 @@ class MovieRecommender:
             features = np.array([[mood_encoded, weather_encoded, day_encoded]])
             
             # Get prediction
-            movie_encoded = self.model.predict(features)[0]
-            movie_title = self.movie_encoder.inverse_transform([movie_encoded])[0]
+            if user_id is None:
+                movie_encoded = self.model.predict(features)[0]
+                confidence = self._get_confidence_score(features, movie_encoded)
+            else:
+                probabilities = self.model.predict_proba(features)[0]
+                movie_encoded = int(np.argmax(self._exclude_seen(probabilities, user_id)))
+                confidence = float(probabilities[movie_encoded])
+            
+            self.popularity.record_serves(self._context_id(mood_encoded, weather_encoded, day_encoded),
+                                          np.array([movie_encoded]))
             
             # Get movie metadata
-            movie_info = next((movie for movie in self.movie_metadata if movie['movie_title'] == movie_title), None)
-            
-            return {
-                'movie_title': movie_title,
-                'confidence': self._get_confidence_score(features, movie_encoded),
-                'input_parameters': {
-                    'mood': mood,
-                    'weather': weather,
-                    'day': day
-                },
-                'year': movie_info.get('year') if movie_info else None,
-                'genre': movie_info.get('genre') if movie_info else None,
-                'description': movie_info.get('description') if movie_info else None
+            recommendation = self.catalog.record(movie_encoded)
+            recommendation['confidence'] = confidence
+            recommendation['input_parameters'] = {
+                'mood': mood,
+                'weather': weather,
+                'day': day
             }
+            return recommendation
                 
+        except ValueError:
+            raise
         except Exception as e:
             raise Exception(f"Error in recommendation: {str(e)}")
     
@@ -114,7 +343,9 @@ class MovieRecommender:
         except:
             return 0.5  # Default confidence if probability calculation fails
     
-    def get_multiple_recommendations(self, mood: str, weather: str, day: str, num_recommendations: int = 3) -> List[Dict]:
+    def get_multiple_recommendations(self, mood: str, weather: str, day: str, num_recommendations: int = 3,
+                                     user_id: Optional[str] = None, diversity: Optional[float] = None,
+                                     popularity_weight: Optional[float] = None) -> List[Dict]:
         """
         Get multiple movie recommendations based on mood, weather, and day.
         
@@ -123,11 +354,22 @@ class MovieRecommender:
             weather: Current weather
             day: Day type
             num_recommendations: Number of recommendations to return
+            user_id: Optional user whose seen movies should be skipped
+            diversity: Optional 0-1 trade-off of relevance for variety; near-duplicate
+                titles and similar genre/year picks are spread out
+            popularity_weight: Optional 0-1 share of the ranking score taken from
+                the smoothed rate at which users recently picked each movie in
+                this context
             
         Returns:
-            List of recommended movies
+            List of recommended movies. Their confidence is always the model
+            probability; with diversity or popularity_weight set it is not the
+            score they were ranked by, so it need not decrease with rank
         """
         try:
+            # Validate inputs
+            self._validate_inputs(mood, weather, day)
+            
             # Encode inputs
             mood_encoded = self.mood_encoder.transform([mood])[0]
             weather_encoded = self.weather_encoder.transform([weather])[0]
@@ -140,25 +382,34 @@ class MovieRecommender:
             probabilities = self.model.predict_proba(features)[0]
             
             # Get top N predictions
-            top_indices = np.argsort(probabilities)[::-1][:num_recommendations]
+            context_id = self._context_id(mood_encoded, weather_encoded, day_encoded)
+            scores = probabilities
+            if popularity_weight:
+                scores = self.popularity.blend(context_id, scores, popularity_weight)
+            scores = self._exclude_seen(scores, user_id)
+            if diversity:
+                # Only movies with a positive score that the user has not seen are
+                # diversified; the rest can only fill up a short list, best first
+                ranked = self.ranker.top_k(scores, max(DIVERSITY_POOL_SIZE, num_recommendations))
+                pool = ranked[scores[ranked] > 0]
+                picked = self.diversity_reranker.rerank(pool, scores[pool], num_recommendations, diversity)
+                filler = ranked[scores[ranked] <= 0][:num_recommendations - len(picked)]
+                top_indices = np.concatenate([picked, filler]).astype(np.intp)
+            else:
+                top_indices = self.ranker.top_k(scores, num_recommendations)
+            self.popularity.record_serves(context_id, top_indices)
             
             recommendations = []
             for idx in top_indices:
-                movie_title = self.movie_encoder.inverse_transform([idx])[0]
-                movie_info = next((movie for movie in self.movie_metadata if movie['movie_title'] == movie_title), None)
-                
-                recommendation = {
-                    'movie_title': movie_title,
-                    'confidence': float(probabilities[idx]),
-                    'rank': len(recommendations) + 1,
-                    'year': movie_info.get('year') if movie_info else None,
-                    'genre': movie_info.get('genre') if movie_info else None,
-                    'description': movie_info.get('description') if movie_info else None
-                }
+                recommendation = self.catalog.record(idx)
+                recommendation['confidence'] = float(probabilities[idx])
+                recommendation['rank'] = len(recommendations) + 1
                 recommendations.append(recommendation)
             
             return recommendations
             
+        except ValueError:
+            raise
         except Exception as e:
             raise Exception(f"Error in multiple recommendations: {str(e)}")
 
@@ -0,0 +1,439 @@
+#!/usr/bin/env python3
+"""
+Inverted index for movie title and description search.
+
+Run directly to time uncached queries over a synthetic catalog:
+
+    python search_index.py --movies 100000
+"""
+
+import argparse
+import re
+import threading
+import time
+from bisect import bisect_left
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from catalog import MovieCatalog
+from ranking import top_k_indices
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+VARIANT_SUFFIX_PATTERN = re.compile(r"\s*[\(\[][^\)\]]*[\)\]]\s*$")
+
+# Relative weight of a term hit in the title versus the description
+TITLE_WEIGHT = 3.0
+DESCRIPTION_WEIGHT = 1.0
+# Penalty applied to prefix (type-ahead) matches compared to whole-word matches
+PREFIX_FACTOR = 0.8
+# Most frequent vocabulary terms a prefix expands to; rarer completions are ignored
+MAX_PREFIX_TERMS = 64
+# Short prefixes expanding to this many postings get a precomputed list of their best documents
+HEAVY_PREFIX_POSTINGS = 20_000
+MAX_HEAVY_PREFIX_LENGTH = 3
+PREFIX_TOP_DOCUMENTS = 1_000
+# Terms in more than this share of documents also get a dense weight array for O(1) lookups
+DENSE_TERM_FRACTION = 0.125
+# Pairs of words matching at least this many documents each get a precomputed list of their
+# best PREFIX_TOP_DOCUMENTS shared documents, used when every query word is that frequent
+HEAVY_TERM_POSTINGS = 20_000
+
+# One way a query term can match: doc ids, their weights, a weight factor and
+# the optional dense weights of the term
+Posting = Tuple[np.ndarray, np.ndarray, float, Optional[np.ndarray]]
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase alphanumeric tokens."""
+    if not text:
+        return []
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def title_family(title: str) -> str:
+    """
+    Get the family key of a title, so that variants share one key.
+
+    "3 Idiots" and "3 Idiots (Tamil Dubbed)" both map to "3 idiots".
+    """
+    stripped = title
+    while True:
+        shorter = VARIANT_SUFFIX_PATTERN.sub('', stripped)
+        if shorter == stripped or not shorter:
+            break
+        stripped = shorter
+    return ' '.join(tokenize(stripped))
+
+
+class SearchIndex:
+    """
+    Inverted index over movie titles and descriptions.
+
+    Built once from the movie catalog when the model loads. Every query term
+    must match; the last term is also matched as a prefix so the index can
+    serve type-ahead lookups. Results are ranked by a tf-idf style score and
+    title variants are grouped under their best scoring member.
+
+    Posting lists are sorted NumPy arrays of document ids and weights. A query
+    starts from its rarest term and looks the candidates up in the other
+    posting lists with binary search, and only the best few matches are ever
+    sorted. Queries whose candidates would still cover much of the catalog
+    start from precomputed best documents instead: those of a heavy short
+    prefix, or those shared by two very frequent words.
+    """
+
+    def __init__(self, catalog: MovieCatalog, cache_size: int = 256):
+        self.catalog = catalog
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[Tuple[str, int], List[Dict]]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self.postings: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self.families: List[str] = []
+        self.family_codes = np.empty(0, dtype=np.int32)
+        self.family_members: List[np.ndarray] = []
+        self.vocabulary: List[str] = []
+        self.document_frequencies = np.empty(0, dtype=np.int32)
+        self.term_lengths = np.empty(0, dtype=np.int32)
+        self.dense_weights: Dict[str, np.ndarray] = {}
+        self.prefix_top: Dict[str, Posting] = {}
+        self.pair_top: Dict[Tuple[str, str], np.ndarray] = {}
+        self._build()
+
+    def _build(self):
+        """Build posting arrays, the sorted vocabulary and title families."""
+        postings: Dict[str, Dict[int, float]] = {}
+        family_lookup: Dict[str, int] = {}
+        family_codes = []
+        for doc_id in range(len(self.catalog)):
+            title = self.catalog.title(doc_id)
+            description = self.catalog.description(doc_id) or ''
+            family = title_family(title)
+            self.families.append(family)
+            family_codes.append(family_lookup.setdefault(family, len(family_lookup)))
+
+            # Shorter titles win ties so "3 Idiots" outranks its dubbed variant
+            title_tokens = tokenize(title)
+            title_weight = TITLE_WEIGHT / max(len(title_tokens), 1) ** 0.5
+            for field_tokens, weight in ((title_tokens, title_weight),
+                                         (tokenize(description), DESCRIPTION_WEIGHT)):
+                for token in field_tokens:
+                    doc_weights = postings.setdefault(token, {})
+                    doc_weights[doc_id] = doc_weights.get(doc_id, 0.0) + weight
+
+        # Scale term weights by inverse document frequency and freeze them as arrays
+        num_docs = max(len(self.catalog), 1)
+        for token, doc_weights in postings.items():
+            idf = 1.0 + (num_docs / len(doc_weights)) ** 0.5
+            doc_ids = np.fromiter(doc_weights.keys(), dtype=np.int32, count=len(doc_weights))
+            weights = np.fromiter(doc_weights.values(), dtype=np.float64, count=len(doc_weights)) * idf
+            self.postings[token] = (doc_ids, weights)
+            if len(doc_ids) > DENSE_TERM_FRACTION * num_docs:
+                dense = np.zeros(num_docs, dtype=np.float64)
+                dense[doc_ids] = weights
+                self.dense_weights[token] = dense
+
+        self.vocabulary = sorted(self.postings)
+        self.document_frequencies = np.array([len(self.postings[term][0]) for term in self.vocabulary],
+                                             dtype=np.int32)
+        self.term_lengths = np.array([len(term) for term in self.vocabulary], dtype=np.int32)
+        self._precompute_heavy_prefixes()
+        self._precompute_heavy_pairs()
+
+        self.family_codes = np.array(family_codes, dtype=np.int32)
+        order = np.argsort(self.family_codes, kind='stable')
+        boundaries = np.flatnonzero(np.diff(self.family_codes[order])) + 1
+        self.family_members = np.split(order, boundaries) if len(order) else []
+
+    def _precompute_heavy_prefixes(self):
+        """
+        Keep the best documents of short prefixes that expand to many postings.
+
+        Type-ahead queries ending in one or two letters would otherwise merge
+        tens of thousands of postings per keystroke; for them only the top
+        PREFIX_TOP_DOCUMENTS documents of the prefix can match.
+        """
+        prefixes = {term[:length] for term in self.vocabulary
+                    for length in range(1, min(len(term), MAX_HEAVY_PREFIX_LENGTH) + 1)}
+        for prefix in prefixes:
+            postings = self._prefix_postings(prefix)
+            if len(postings) < 2 or sum(len(posting[0]) for posting in postings) < HEAVY_PREFIX_POSTINGS:
+                continue
+            doc_ids, weights = self._materialize(postings)
+            if len(doc_ids) > PREFIX_TOP_DOCUMENTS:
+                top = np.sort(top_k_indices(weights, PREFIX_TOP_DOCUMENTS))
+                doc_ids, weights = doc_ids[top], weights[top]
+            self.prefix_top[prefix] = (doc_ids, weights, 1.0, None)
+
+    def _precompute_heavy_pairs(self):
+        """
+        Keep the best shared documents of every pair of very frequent words.
+
+        A query made only of such words would otherwise score tens of
+        thousands of candidates; for them only the top PREFIX_TOP_DOCUMENTS
+        documents of two of its words, by their summed weights, can match.
+        """
+        heavy_terms = sorted(term for term, (doc_ids, _) in self.postings.items()
+                             if len(doc_ids) >= HEAVY_TERM_POSTINGS)
+        for i, first in enumerate(heavy_terms):
+            candidates, scores = self._materialize([self._term_posting(first)])
+            for second in heavy_terms[i + 1:]:
+                weights = self._lookup([self._term_posting(second)], candidates)
+                matched = np.flatnonzero(weights > 0)
+                if len(matched) > PREFIX_TOP_DOCUMENTS:
+                    matched = np.sort(matched[top_k_indices(scores[matched] + weights[matched],
+                                                            PREFIX_TOP_DOCUMENTS)])
+                self.pair_top[(first, second)] = candidates[matched]
+
+    def _heavy_pair_candidates(self, terms: List[str]) -> Optional[np.ndarray]:
+        """Get the precomputed best shared documents of two whole words of a query, if there are any."""
+        # The last word only counts if it is a whole word itself; its completions
+        # are then only matched among these documents
+        heavy_terms = sorted({term for term in terms if term in self.postings
+                              and len(self.postings[term][0]) >= HEAVY_TERM_POSTINGS})
+        if len(heavy_terms) < 2:
+            return None
+        return self.pair_top.get((heavy_terms[0], heavy_terms[1]))
+
+    def _expand_prefix(self, prefix: str) -> List[str]:
+        """
+        Get the vocabulary terms starting with the prefix.
+
+        At most MAX_PREFIX_TERMS are used: the most frequent ones, shorter
+        terms first among equally frequent ones, plus the prefix itself if it
+        is a whole term.
+        """
+        start = bisect_left(self.vocabulary, prefix)
+        end = bisect_left(self.vocabulary, prefix + '\uffff', lo=start)
+        if end - start <= MAX_PREFIX_TERMS:
+            return self.vocabulary[start:end]
+
+        priority = self.document_frequencies[start:end].astype(np.int64) * 1024 - self.term_lengths[start:end]
+        keep = np.argpartition(-priority, MAX_PREFIX_TERMS - 1)[:MAX_PREFIX_TERMS]
+        terms = [self.vocabulary[start + i] for i in np.sort(keep)]
+        if self.vocabulary[start] == prefix and prefix not in terms:
+            terms.append(prefix)
+        return terms
+
+    def _term_posting(self, term: str, factor: float = 1.0) -> Posting:
+        """Get the posting of a vocabulary term."""
+        doc_ids, weights = self.postings[term]
+        return doc_ids, weights, factor, self.dense_weights.get(term)
+
+    def _prefix_postings(self, prefix: str) -> List[Posting]:
+        """Get the postings a prefix expands to, prefix completions weighted down by PREFIX_FACTOR."""
+        return [self._term_posting(term, 1.0 if term == prefix else PREFIX_FACTOR)
+                for term in self._expand_prefix(prefix)]
+
+    @staticmethod
+    def _materialize(postings: List[Posting]) -> Tuple[np.ndarray, np.ndarray]:
+        """Merge alternative postings into sorted doc ids with the best weight per doc."""
+        if len(postings) == 1:
+            doc_ids, weights, factor, _ = postings[0]
+            return doc_ids, weights if factor == 1.0 else weights * factor
+        doc_ids = np.concatenate([posting[0] for posting in postings])
+        weights = np.concatenate([weights * factor for _, weights, factor, _ in postings])
+        order = np.lexsort((-weights, doc_ids))
+        doc_ids = doc_ids[order]
+        first = np.concatenate(([True], doc_ids[1:] != doc_ids[:-1]))
+        return doc_ids[first], weights[order][first]
+
+    @staticmethod
+    def _lookup(postings: List[Posting], candidates: np.ndarray) -> np.ndarray:
+        """Get the best weight of each candidate doc across alternative postings, 0 where none matches."""
+        best = np.zeros(len(candidates), dtype=np.float64)
+        for doc_ids, weights, factor, dense in postings:
+            if dense is not None:
+                found_weights = dense[candidates]
+            elif len(doc_ids) < len(candidates):
+                # Binary-search the posting ids in the candidates instead
+                positions = np.minimum(np.searchsorted(candidates, doc_ids), len(candidates) - 1)
+                found = candidates[positions] == doc_ids
+                positions = positions[found]
+                best[positions] = np.maximum(best[positions], weights[found] * factor)
+                continue
+            else:
+                positions = np.minimum(np.searchsorted(doc_ids, candidates), len(doc_ids) - 1)
+                found_weights = np.where(doc_ids[positions] == candidates, weights[positions], 0.0)
+            np.maximum(best, found_weights * factor if factor != 1.0 else found_weights, out=best)
+        return best
+
+    def search(self, query: str, limit: int = 10) -> List[Dict]:
+        """
+        Search the catalog.
+
+        Args:
+            query: Free text query, the last word may be incomplete
+            limit: Maximum number of grouped results to return
+
+        Returns:
+            List of results ordered by score, each with its title variants
+        """
+        terms = tokenize(query)
+        if not terms or limit < 1:
+            return []
+
+        key = (' '.join(terms), limit)
+        with self._cache_lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                return cached
+
+        results, truncated = self._search(terms, limit, use_precomputed=True)
+        if len(results) < limit and truncated:
+            # The precomputed best documents did not combine with the other words; search exactly
+            results, _ = self._search(terms, limit, use_precomputed=False)
+
+        with self._cache_lock:
+            self._cache[key] = results
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return results
+
+    def _search(self, terms: List[str], limit: int, use_precomputed: bool) -> Tuple[List[Dict], bool]:
+        """
+        Score, intersect and group the matches of tokenized query terms.
+
+        Returns:
+            The grouped results, and whether only precomputed best documents
+            of a multi-word query were considered
+        """
+        # Each query term is a list of alternative postings: one for a whole
+        # word, several for the prefix-matched last word
+        term_postings = []
+        for term in terms[:-1]:
+            if term not in self.postings:
+                return [], False
+            term_postings.append([self._term_posting(term)])
+        truncated = False
+        if use_precomputed and terms[-1] in self.prefix_top:
+            # Heavy short prefix: only its precomputed best documents can match
+            prefix_postings = [self.prefix_top[terms[-1]]]
+            truncated = len(terms) > 1
+        else:
+            prefix_postings = self._prefix_postings(terms[-1])
+            if not prefix_postings:
+                return [], False
+        term_postings.append(prefix_postings)
+
+        # Start from the rarest term and look the candidates up in the others,
+        # so the cost follows the shortest posting list, not the catalog size
+        term_postings.sort(key=lambda postings: sum(len(posting[0]) for posting in postings))
+        pair_candidates = None
+        if use_precomputed and sum(len(posting[0]) for posting in term_postings[0]) >= HEAVY_TERM_POSTINGS:
+            pair_candidates = self._heavy_pair_candidates(terms)
+        if pair_candidates is not None:
+            # Every word is very frequent: only the best shared documents of two of them can match
+            candidates, scores = pair_candidates, np.zeros(len(pair_candidates), dtype=np.float64)
+            remaining, truncated = term_postings, True
+        else:
+            candidates, scores = self._materialize(term_postings[0])
+            remaining = term_postings[1:]
+        for postings in remaining:
+            weights = self._lookup(postings, candidates)
+            matched = weights > 0
+            candidates, scores = candidates[matched], scores[matched] + weights[matched]
+            if len(candidates) == 0:
+                return [], truncated
+
+        return self._group(candidates, scores, limit), truncated
+
+    def _group(self, candidates: np.ndarray, scores: np.ndarray, limit: int) -> List[Dict]:
+        """
+        Group the best matches by title family, keeping the best one first.
+
+        Only the top few candidates are ranked; if they collapse into fewer
+        than `limit` families, more are ranked until enough are found.
+
+        Args:
+            candidates: Matching doc ids, ascending
+            scores: Score of each candidate
+            limit: Maximum number of families to return
+        """
+        results: List[Dict] = []
+        seen_families = set()
+        ranked_count = 0
+        depth = 2 * limit
+        while len(results) < limit and ranked_count < len(candidates):
+            # Candidates are sorted, so ties on position are ties on doc id
+            ranked = top_k_indices(scores, depth)
+            for position in ranked[ranked_count:]:
+                doc_id = int(candidates[position])
+                family = int(self.family_codes[doc_id])
+                if family in seen_families:
+                    continue
+                seen_families.add(family)
+
+                group = self.catalog.record(doc_id)
+                group['score'] = round(float(scores[position]), 4)
+                group['variants'] = self._matched_variants(family, doc_id, candidates, scores)
+                results.append(group)
+                if len(results) >= limit:
+                    break
+            ranked_count = len(ranked)
+            depth *= 4
+        return results
+
+    def _matched_variants(self, family: int, best_doc_id: int, candidates: np.ndarray,
+                          scores: np.ndarray) -> List[str]:
+        """Get the titles of the other matching members of a family, best first."""
+        members = self.family_members[family]
+        if len(members) == 1:
+            return []
+        positions = np.minimum(np.searchsorted(candidates, members), len(candidates) - 1)
+        matched = (candidates[positions] == members) & (members != best_doc_id)
+        members, member_scores = members[matched], scores[positions[matched]]
+        return [self.catalog.title(member) for member in members[np.lexsort((members, -member_scores))]]
+
+    def clear_cache(self):
+        """Drop all cached query results."""
+        with self._cache_lock:
+            self._cache.clear()
+
+    def get_stats(self) -> Dict[str, Optional[int]]:
+        """Get basic statistics about the index."""
+        return {
+            'documents': len(self.catalog),
+            'terms': len(self.vocabulary),
+            'cached_queries': len(self._cache)
+        }
+
+
+def main():
+    """Time uncached queries over a synthetic catalog."""
+    from generate_dataset import DESCRIPTION_ACTIONS, DESCRIPTION_ENDINGS, DESCRIPTION_SUBJECTS
+
+    parser = argparse.ArgumentParser(description="Benchmark search over a synthetic catalog.")
+    parser.add_argument('--movies', type=int, default=100_000, help="Catalog size")
+    parser.add_argument('--repeats', type=int, default=20, help="Timed repetitions per query")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    titles = [f'Synthetic Movie {i}' for i in range(args.movies)]
+    titles += [f'Synthetic Movie {i} (Dubbed)' for i in range(0, args.movies, 50)]
+    titles = np.array(sorted(titles), dtype=object)
+    metadata = [{
+        'movie_title': title,
+        'year': int(rng.integers(1950, 2025)),
+        'genre': 'Bollywood',
+        'description': (f'{DESCRIPTION_SUBJECTS[rng.integers(len(DESCRIPTION_SUBJECTS))]} '
+                        f'{DESCRIPTION_ACTIONS[rng.integers(len(DESCRIPTION_ACTIONS))]}, '
+                        f'{DESCRIPTION_ENDINGS[rng.integers(len(DESCRIPTION_ENDINGS))]}')
+    } for title in titles]
+
+    start = time.perf_counter()
+    index = SearchIndex(MovieCatalog(titles, metadata), cache_size=0)
+    print(f"Indexed {len(titles):,} titles in {time.perf_counter() - start:.2f}s")
+
+    for query in ('s', 'syn', 'synthetic movie 12', 'movie 4', 'a young', 'young a', 'dreamer journey',
+                  'synthetic movie'):
+        start = time.perf_counter()
+        for _ in range(args.repeats):
+            index.search(query, 10)
+        print(f"  {query!r}: {(time.perf_counter() - start) / args.repeats * 1000:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
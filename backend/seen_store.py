@@ -0,0 +1,189 @@
+import hashlib
+import json
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from memory_report import deep_sizeof
+
+
+class SeenHistoryStore:
+    """
+    Persistent per-user record of movies a user has already seen.
+
+    Each user's history is a bitset indexed by movie class id (the position in
+    `movie_encoder.classes_`), packed with `np.packbits` and stored as one
+    SQLite row per user. Recently used users are kept in an LRU cache so the
+    request path usually never touches the database.
+
+    Class ids shift whenever a retrain adds or removes a title, so the
+    database also stores the titles its bitsets refer to. When the store is
+    opened with a different catalog, every history is remapped by title and
+    titles that no longer exist are dropped.
+    """
+
+    def __init__(self, db_path: str = 'seen_history.db', cache_size: int = 4096,
+                 titles: Optional[Sequence[str]] = None):
+        self.db_path = db_path
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(db_path, check_same_thread=False)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+        self._connection.execute(
+            'CREATE TABLE IF NOT EXISTS seen_history (user_id TEXT PRIMARY KEY, bits BLOB NOT NULL)'
+        )
+        self._connection.execute(
+            'CREATE TABLE IF NOT EXISTS seen_history_meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)'
+        )
+        self._connection.commit()
+        if titles is not None:
+            self._sync_catalog([str(title) for title in titles])
+
+    @staticmethod
+    def catalog_fingerprint(titles: Sequence[str]) -> str:
+        """Get a checksum identifying a catalog's titles in class id order."""
+        return hashlib.sha256('\n'.join(titles).encode('utf-8')).hexdigest()
+
+    def _get_meta(self, key: str) -> Optional[str]:
+        """Read a value from the metadata table."""
+        row = self._connection.execute('SELECT value FROM seen_history_meta WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key: str, value: str):
+        """Write a value to the metadata table, without committing."""
+        self._connection.execute(
+            'INSERT INTO seen_history_meta (key, value) VALUES (?, ?) '
+            'ON CONFLICT(key) DO UPDATE SET value = excluded.value',
+            (key, value)
+        )
+
+    def _sync_catalog(self, titles: List[str]):
+        """
+        Make stored bitsets refer to the given catalog.
+
+        Histories written for another catalog are remapped through the titles
+        stored with them, in one transaction. Databases written before titles
+        were stored are assumed to match the current catalog.
+        """
+        fingerprint = self.catalog_fingerprint(titles)
+        stored_fingerprint = self._get_meta('catalog_fingerprint')
+        if stored_fingerprint == fingerprint:
+            return
+
+        if stored_fingerprint is not None:
+            old_titles = json.loads(self._get_meta('catalog_titles'))
+            new_ids = {title: class_id for class_id, title in enumerate(titles)}
+            remap = np.array([new_ids.get(title, -1) for title in old_titles], dtype=np.int64)
+
+            rows = self._connection.execute('SELECT user_id, bits FROM seen_history').fetchall()
+            for user_id, bits in rows:
+                old_seen = np.flatnonzero(np.unpackbits(np.frombuffer(bytes(bits), dtype=np.uint8)))
+                new_seen = remap[old_seen[old_seen < len(remap)]]
+                seen = np.zeros(len(titles), dtype=bool)
+                seen[new_seen[new_seen >= 0]] = True
+                self._connection.execute('UPDATE seen_history SET bits = ? WHERE user_id = ?',
+                                         (np.packbits(seen).tobytes(), user_id))
+            print(f"Remapped {len(rows)} seen histories to the retrained movie catalog")
+
+        self._set_meta('catalog_titles', json.dumps(titles, ensure_ascii=False))
+        self._set_meta('catalog_fingerprint', fingerprint)
+        self._connection.commit()
+        self._cache.clear()
+
+    def _load(self, user_id: str) -> bytes:
+        """Get the packed bitset for a user, from the cache or the database."""
+        bits = self._cache.get(user_id)
+        if bits is not None:
+            self._cache.move_to_end(user_id)
+            return bits
+
+        row = self._connection.execute(
+            'SELECT bits FROM seen_history WHERE user_id = ?', (user_id,)
+        ).fetchone()
+        bits = bytes(row[0]) if row else b''
+        self._remember(user_id, bits)
+        return bits
+
+    def _remember(self, user_id: str, bits: bytes):
+        """Put a user's bitset in the hot-user cache."""
+        self._cache[user_id] = bits
+        self._cache.move_to_end(user_id)
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def get_mask(self, user_id: str, num_movies: int) -> Optional[np.ndarray]:
+        """
+        Get a boolean mask of seen movies for a user.
+
+        Args:
+            user_id: User identifier
+            num_movies: Number of movie classes the mask should cover
+
+        Returns:
+            Boolean array of length num_movies, or None if nothing was seen
+        """
+        with self._lock:
+            bits = self._load(user_id)
+        if not bits:
+            return None
+
+        packed = np.frombuffer(bits, dtype=np.uint8)
+        num_bytes = (num_movies + 7) // 8
+        if len(packed) < num_bytes:
+            packed = np.concatenate([packed, np.zeros(num_bytes - len(packed), dtype=np.uint8)])
+        return np.unpackbits(packed[:num_bytes], count=num_movies).astype(bool)
+
+    def mark_seen(self, user_id: str, movie_ids: Iterable[int]) -> int:
+        """
+        Record that a user has seen the given movies.
+
+        Args:
+            user_id: User identifier
+            movie_ids: Movie class ids to add to the user's history
+
+        Returns:
+            Total number of movies in the user's history
+        """
+        movie_ids = np.fromiter((int(movie_id) for movie_id in movie_ids), dtype=np.int64)
+        if len(movie_ids) and movie_ids.min() < 0:
+            raise ValueError("Movie ids must be non-negative")
+
+        with self._lock:
+            packed = np.frombuffer(self._load(user_id), dtype=np.uint8)
+            num_bits = max(len(packed) * 8, int(movie_ids.max()) + 1 if len(movie_ids) else 0)
+            seen = np.zeros(num_bits, dtype=bool)
+            seen[:len(packed) * 8] = np.unpackbits(packed).astype(bool)
+            seen[movie_ids] = True
+            bits = np.packbits(seen).tobytes()
+
+            self._connection.execute(
+                'INSERT INTO seen_history (user_id, bits) VALUES (?, ?) '
+                'ON CONFLICT(user_id) DO UPDATE SET bits = excluded.bits',
+                (user_id, bits)
+            )
+            self._connection.commit()
+            self._remember(user_id, bits)
+
+        return int(seen.sum())
+
+    def get_memory_usage(self) -> int:
+        """Get the bytes held by the hot-user cache."""
+        with self._lock:
+            return deep_sizeof(self._cache)
+
+    def clear(self, user_id: str):
+        """Forget a user's history."""
+        with self._lock:
+            self._connection.execute('DELETE FROM seen_history WHERE user_id = ?', (user_id,))
+            self._connection.commit()
+            self._cache.pop(user_id, None)
+
+    def close(self):
+        """Close the underlying database connection."""
+        with self._lock:
+            self._connection.close()
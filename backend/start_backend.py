@@ -2,7 +2,7 @@
 """
 Startup script for the Bollywood Movie Recommendation Backend.
 This script will:
-1. Check if the model exists, if not train it
+1. Check if a usable model exists, if not train it
 2. Start the FastAPI server
 """
 
@@ -11,25 +11,43 @@ import sys
 import subprocess
 import time
 
+from artifacts import ARTIFACT_FILES, MANIFEST_FILE, known_good_directory, verify_artifacts
+
 def check_model_files():
     """Check if all required model files exist."""
-    required_files = [
-        'model.pkl',
-        'mood_encoder.pkl', 
-        'weather_encoder.pkl',
-        'day_encoder.pkl',
-        'movie_encoder.pkl',
-        'movie_metadata.json',
-        'encoder_mappings.json'
-    ]
-    
     missing_files = []
-    for file in required_files:
+    for file in ARTIFACT_FILES:
         if not os.path.exists(file):
             missing_files.append(file)
     
     return missing_files
 
+def has_usable_model() -> bool:
+    """
+    Check whether the server can start without training.
+    
+    The working artifacts are usable if they match their checksum manifest, or
+    if they are all present without a manifest (trained before manifests
+    existed). Otherwise the server falls back to the last known-good set, so
+    a corrupt or half-written model does not mean retraining on boot.
+    """
+    problems = verify_artifacts()
+    if not problems:
+        print("✅ Model files found and verified.")
+        return True
+    
+    if problems == [f"no {MANIFEST_FILE} in ."] and not check_model_files():
+        print("✅ Model files found (no checksum manifest to verify them against).")
+        return True
+    
+    print(f"⚠️  Model files failed verification: {'; '.join(problems)}")
+    known_good = known_good_directory()
+    if known_good is not None and not verify_artifacts(known_good):
+        print(f"✅ The server will use the last known-good model in {known_good}.")
+        return True
+    
+    return False
+
 def train_model():
     """Train the recommendation model."""
     print("🚀 Training the recommendation model...")
@@ -72,18 +90,18 @@ def main():
         print("Please ensure the CSV file is in the backend directory.")
         return
     
-    # Check if model files exist
-    missing_files = check_model_files()
-    
-    if missing_files:
-        print(f"📋 Missing model files: {', '.join(missing_files)}")
+    # Check if a usable model exists
+    if not has_usable_model():
+        missing_files = check_model_files()
+        if missing_files:
+            print(f"📋 Missing model files: {', '.join(missing_files)}")
         print("Training new model...")
         
         if not train_model():
             print("❌ Failed to train model. Exiting.")
             return
     else:
-        print("✅ Model files found. Skipping training.")
+        print("Skipping training.")
     
     # Start the server
     start_server()
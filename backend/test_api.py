@@ -1,6 +1,7 @@
 import requests
 import json
 import time
+from concurrent.futures import ThreadPoolExecutor
 
 def test_api():
     """Test the movie recommendation API endpoints."""
@@ -112,6 +113,153 @@ def test_api():
     except Exception as e:
         print(f"❌ Invalid input test error: {e}")
     
+    # Test 7: Seen history exclusion
+    print("\n7. Testing seen history exclusion...")
+    try:
+        payload = {
+            "mood": "Relaxed",
+            "weather": "Rainy",
+            "day": "Weekend",
+            "user_id": "test-user"
+        }
+        first = requests.post(f"{base_url}/recommend", json=payload).json()['movie_title']
+        requests.post(f"{base_url}/seen", json={"user_id": "test-user", "movie_titles": [first]})
+        second = requests.post(f"{base_url}/recommend", json=payload).json()['movie_title']
+        if second != first:
+            print("✅ Seen movie excluded")
+            print(f"   Before: {first}, after: {second}")
+        else:
+            print(f"❌ Seen movie still recommended: {first}")
+    except Exception as e:
+        print(f"❌ Seen history error: {e}")
+    
+    # Test 8: Search
+    print("\n8. Testing movie search...")
+    try:
+        response = requests.get(f"{base_url}/search", params={"q": "3 idi", "limit": 5})
+        if response.status_code == 200:
+            results = response.json()
+            print("✅ Search successful")
+            for result in results:
+                print(f"   {result['movie_title']} (score: {result['score']:.2f}, variants: {result['variants']})")
+        else:
+            print(f"❌ Search failed: {response.status_code}")
+    except Exception as e:
+        print(f"❌ Search error: {e}")
+    
+    # Test 9: Load shedding
+    print("\n9. Testing load shedding...")
+    try:
+        payload = {
+            "mood": "Happy",
+            "weather": "Sunny",
+            "day": "Weekend",
+            "num_recommendations": 10
+        }
+        with ThreadPoolExecutor(max_workers=100) as executor:
+            responses = list(executor.map(
+                lambda _: requests.post(f"{base_url}/recommendations", json=payload), range(300)
+            ))
+        shed = [response for response in responses if response.status_code == 503]
+        served = sum(response.status_code == 200 for response in responses)
+        if shed and all("Retry-After" in response.headers for response in shed):
+            print("✅ Overload shed with 503 and Retry-After")
+            print(f"   Served: {served}, shed: {len(shed)}, Retry-After: {shed[0].headers['Retry-After']}s")
+        elif not shed and served == len(responses):
+            print(f"⚠️  All {served} requests served; lower ADMISSION_MAX_QUEUE to exercise shedding")
+        else:
+            print(f"❌ Shed responses missing Retry-After (served: {served}, shed: {len(shed)})")
+    except Exception as e:
+        print(f"❌ Load shedding error: {e}")
+    
+    # Test 10: Memory report
+    print("\n10. Testing memory report...")
+    try:
+        response = requests.get(f"{base_url}/memory")
+        if response.status_code == 200:
+            report = response.json()
+            print("✅ Memory report retrieved")
+            for component, size in report['components'].items():
+                print(f"   {component}: {size / 1024:.1f} KB")
+            print(f"   Process RSS: {report['process_rss']}")
+        else:
+            print(f"❌ Memory report failed: {response.status_code}")
+    except Exception as e:
+        print(f"❌ Memory report error: {e}")
+    
+    # Test 11: Snapshot revalidation
+    print("\n11. Testing snapshot ETag revalidation...")
+    try:
+        response = requests.get(f"{base_url}/snapshot")
+        etag = response.headers.get("ETag")
+        revalidated = requests.get(f"{base_url}/snapshot", headers={"If-None-Match": etag})
+        identity = requests.get(f"{base_url}/snapshot", headers={"Accept-Encoding": "gzip;q=0, identity"})
+        if (response.status_code == 200 and etag and revalidated.status_code == 304
+                and "Content-Encoding" not in identity.headers):
+            print("✅ Snapshot served and revalidated")
+            print(f"   ETag: {etag}, contexts: {len(response.json()['rankings'])}, "
+                  f"encoding: {response.headers.get('Content-Encoding', 'identity')}")
+        else:
+            print(f"❌ Snapshot revalidation failed: {response.status_code}, {revalidated.status_code}, "
+                  f"gzip;q=0 encoding: {identity.headers.get('Content-Encoding')}")
+    except Exception as e:
+        print(f"❌ Snapshot error: {e}")
+    
+    # Test 12: Diversified recommendations
+    print("\n12. Testing diversified recommendations...")
+    try:
+        payload = {
+            "mood": "Happy",
+            "weather": "Sunny",
+            "day": "Weekend",
+            "num_recommendations": 5,
+            "diversity": 0.5
+        }
+        response = requests.post(f"{base_url}/recommendations", json=payload)
+        invalid = requests.post(f"{base_url}/recommendations", json={**payload, "diversity": 2})
+        if response.status_code == 200 and invalid.status_code == 400:
+            recommendations = response.json()
+            positive = [rec['confidence'] > 0 for rec in recommendations]
+            if positive == sorted(positive, reverse=True):
+                print("✅ Diversified recommendations successful")
+            else:
+                print("❌ Zero-probability movie ranked above a positive one")
+            for rec in recommendations:
+                print(f"   {rec['rank']}. {rec['movie_title']} (confidence: {rec['confidence']:.2f})")
+        else:
+            print(f"❌ Diversified recommendations failed: {response.status_code}, "
+                  f"diversity=2 gave {invalid.status_code}")
+    except Exception as e:
+        print(f"❌ Diversified recommendations error: {e}")
+    
+    # Test 13: Feedback and popularity blending
+    print("\n13. Testing feedback and popularity blending...")
+    try:
+        payload = {
+            "mood": "Melancholic",
+            "weather": "Cloudy",
+            "day": "Weekday",
+            "num_recommendations": 10
+        }
+        ranked = requests.post(f"{base_url}/recommendations", json=payload).json()
+        picked = ranked[-1]['movie_title']
+        feedback = requests.post(f"{base_url}/feedback", json={**{key: payload[key] for key in ("mood", "weather", "day")},
+                                                               "movie_title": picked})
+        blended = requests.post(f"{base_url}/recommendations", json={**payload, "popularity_weight": 0.5})
+        invalid = requests.post(f"{base_url}/recommendations", json={**payload, "popularity_weight": 2})
+        if feedback.status_code == 200 and blended.status_code == 200 and invalid.status_code == 400:
+            top = blended.json()[0]['movie_title']
+            if top != picked:
+                print("✅ Feedback recorded without a single pick taking over the ranking")
+            else:
+                print(f"❌ One pick moved {picked} to rank 1")
+            print(f"   Picked: {picked}, top with popularity_weight=0.5: {top}")
+        else:
+            print(f"❌ Feedback failed: {feedback.status_code}, blended {blended.status_code}, "
+                  f"popularity_weight=2 gave {invalid.status_code}")
+    except Exception as e:
+        print(f"❌ Feedback error: {e}")
+    
     print("\n" + "=" * 50)
     print("🎉 API testing completed!")
 
@@ -7,8 +7,20 @@ from sklearn.metrics import accuracy_score, classification_report
 import joblib
 import json
 import csv
+import argparse
+import sys
+import time
 
-def clean_csv_file():
+from artifacts import atomic_write, write_manifest
+from distributed_training import prediction_agreement, train_distributed_forest
+
+# --verify passes when the sharded model's distance to an independent
+# single-process model is at most this much above the largest seed-to-seed
+# distance between single-process models
+VERIFY_TOLERANCE = 0.25
+VERIFY_RESEEDS = 3
+
+def clean_csv_file(source: str = 'movie_recommendation_dataset.csv'):
     """
     Clean the CSV file by properly handling descriptions with commas.
     """
@@ -18,7 +30,7 @@ def clean_csv_file():
     cleaned_rows = []
     
     try:
-        with open('movie_recommendation_dataset.csv', 'r', encoding='utf-8') as file:
+        with open(source, 'r', encoding='utf-8') as file:
             reader = csv.reader(file)
             header = next(reader)  # Get the header
             cleaned_rows.append(header)
@@ -43,7 +55,7 @@ def clean_csv_file():
                     
     except UnicodeDecodeError:
         # Try with latin-1 encoding
-        with open('movie_recommendation_dataset.csv', 'r', encoding='latin-1') as file:
+        with open(source, 'r', encoding='latin-1') as file:
             reader = csv.reader(file)
             header = next(reader)
             cleaned_rows.append(header)
@@ -68,56 +80,23 @@ def clean_csv_file():
     
     print("CSV file cleaned successfully!")
 
-def train_recommendation_model():
-    """
-    Train a movie recommendation model using the CSV data.
-    The model predicts movie titles based on mood, weather, and day.
+FEATURE_COLUMNS = ['mood_encoded', 'weather_encoded', 'day_encoded']
+
+def encode_dataset(df):
     """
+    Drop unusable rows and label-encode the dataset.
     
-    # First clean the CSV file
-    clean_csv_file()
-    
-    # Load the cleaned data
-    print("Loading cleaned data...")
-    try:
-        df = pd.read_csv('movie_recommendation_dataset_cleaned.csv', encoding='utf-8')
-    except Exception as e:
-        print(f"Error reading cleaned CSV file: {e}")
-        return
-    
-    # Display basic info
-    print(f"Dataset shape: {df.shape}")
-    print(f"Columns: {list(df.columns)}")
-    print(f"Unique movies: {df['movie_title'].nunique()}")
-    print(f"Unique moods: {df['mood'].unique()}")
-    print(f"Unique weather: {df['weather'].unique()}")
-    print(f"Unique days: {df['day'].unique()}")
-    
-    # Check for missing values
-    print(f"\nMissing values:")
-    print(df.isnull().sum())
+    Movies that appear only once are removed because they cannot be stratified.
     
+    Returns:
+        Tuple of the encoded DataFrame and a dict of fitted label encoders
+        keyed by 'mood', 'weather', 'day' and 'movie'
+    """
     # Remove any rows with missing values in required columns
     required_columns = ['movie_title', 'mood', 'weather', 'day']
     df = df.dropna(subset=required_columns)
     print(f"Dataset shape after removing missing values: {df.shape}")
     
-    # Create label encoders for categorical variables
-    mood_encoder = LabelEncoder()
-    weather_encoder = LabelEncoder()
-    day_encoder = LabelEncoder()
-    movie_encoder = LabelEncoder()
-    
-    # Encode categorical variables
-    df['mood_encoded'] = mood_encoder.fit_transform(df['mood'])
-    df['weather_encoded'] = weather_encoder.fit_transform(df['weather'])
-    df['day_encoded'] = day_encoder.fit_transform(df['day'])
-    df['movie_encoded'] = movie_encoder.fit_transform(df['movie_title'])
-    
-    # Prepare features and target
-    X = df[['mood_encoded', 'weather_encoded', 'day_encoded']]
-    y = df['movie_encoded']
-    
     # Check for movies that appear only once (can't be stratified)
     movie_counts = df['movie_title'].value_counts()
     movies_with_single_occurrence = movie_counts[movie_counts == 1].index.tolist()
@@ -130,31 +109,32 @@ def train_recommendation_model():
             print(f"  ... and {len(movies_with_single_occurrence) - 5} more")
         
         # Remove movies that appear only once
-        df_filtered = df[~df['movie_title'].isin(movies_with_single_occurrence)]
-        
-        # Retrain encoders on filtered data
-        mood_encoder = LabelEncoder()
-        weather_encoder = LabelEncoder()
-        day_encoder = LabelEncoder()
-        movie_encoder = LabelEncoder()
-        
-        # Encode categorical variables on filtered data
-        df_filtered['mood_encoded'] = mood_encoder.fit_transform(df_filtered['mood'])
-        df_filtered['weather_encoded'] = weather_encoder.fit_transform(df_filtered['weather'])
-        df_filtered['day_encoded'] = day_encoder.fit_transform(df_filtered['day'])
-        df_filtered['movie_encoded'] = movie_encoder.fit_transform(df_filtered['movie_title'])
-        
-        X = df_filtered[['mood_encoded', 'weather_encoded', 'day_encoded']]
-        y = df_filtered['movie_encoded']
+        df_filtered = df[~df['movie_title'].isin(movies_with_single_occurrence)].copy()
         
         print(f"Dataset shape after removing single-occurrence movies: {df_filtered.shape}")
         print(f"Unique movies after filtering: {df_filtered['movie_title'].nunique()}")
     else:
         # Use original data if no single-occurrence movies
-        df_filtered = df
-        X = df_filtered[['mood_encoded', 'weather_encoded', 'day_encoded']]
-        y = df_filtered['movie_encoded']
+        df_filtered = df.copy()
+    
+    # Create label encoders for categorical variables
+    encoders = {
+        'mood': LabelEncoder(),
+        'weather': LabelEncoder(),
+        'day': LabelEncoder(),
+        'movie': LabelEncoder()
+    }
+    
+    # Encode categorical variables
+    df_filtered['mood_encoded'] = encoders['mood'].fit_transform(df_filtered['mood'])
+    df_filtered['weather_encoded'] = encoders['weather'].fit_transform(df_filtered['weather'])
+    df_filtered['day_encoded'] = encoders['day'].fit_transform(df_filtered['day'])
+    df_filtered['movie_encoded'] = encoders['movie'].fit_transform(df_filtered['movie_title'])
     
+    return df_filtered, encoders
+
+def split_dataset(X, y):
+    """Split features and target into train and test sets, stratified when possible."""
     # Split the data - use stratify only if we have enough samples per class
     try:
         X_train, X_test, y_train, y_test = train_test_split(
@@ -168,16 +148,112 @@ def train_recommendation_model():
             X, y, test_size=0.2, random_state=42
         )
     
-    # Train Random Forest model
-    print("Training Random Forest model...")
-    model = RandomForestClassifier(
+    return X_train, X_test, y_train, y_test
+
+def build_model():
+    """Create the (unfitted) recommendation model."""
+    return RandomForestClassifier(
         n_estimators=100,
         max_depth=10,
         random_state=42,
         class_weight='balanced'
     )
+
+def verify_sharded_model(model, n_shards: int, X_train, y_train, X_test, y_test) -> bool:
+    """
+    Check that a sharded model is within seed-to-seed variation of single-process training.
+    
+    Single-process models are trained with seeds the sharded workers did not
+    use. The sharded model's mean total variation distance to the first of
+    them must stay within VERIFY_TOLERANCE of the largest distance between
+    that model and the other, reseeded, single-process models.
+    """
+    base_seed = build_model().random_state + n_shards
+    reference = build_model().set_params(random_state=base_seed).fit(X_train, y_train)
+    
+    noise_floor = 0.0
+    for seed in range(base_seed + 1, base_seed + 1 + VERIFY_RESEEDS):
+        reseeded = build_model().set_params(random_state=seed).fit(X_train, y_train)
+        agreement = prediction_agreement(reseeded, reference, X_test)
+        noise_floor = max(noise_floor, agreement['mean_total_variation'])
+        print(f"Reseeded single-process model (seed {seed}): top-1 {agreement['top1_agreement']:.2%}, "
+              f"mean total variation {agreement['mean_total_variation']:.4f}")
+    
+    agreement = prediction_agreement(model, reference, X_test)
+    limit = noise_floor * (1 + VERIFY_TOLERANCE)
+    print(f"Sharded model: top-1 {agreement['top1_agreement']:.2%}, "
+          f"mean total variation {agreement['mean_total_variation']:.4f} (limit {limit:.4f})")
+    print(f"Single-process accuracy: {accuracy_score(y_test, reference.predict(X_test)):.4f}")
+    return agreement['mean_total_variation'] <= limit
+
+def train_recommendation_model(n_shards: int = 1, max_workers: int = None, verify: bool = False,
+                               dataset: str = 'movie_recommendation_dataset.csv', shard_dir: str = None):
+    """
+    Train a movie recommendation model using the CSV data.
+    The model predicts movie titles based on mood, weather, and day.
+    
+    Args:
+        n_shards: Number of data partitions to train in parallel worker
+            processes; 1 trains in this process
+        max_workers: Worker process pool size, defaults to n_shards
+        verify: With n_shards > 1, also train single-process models and fail,
+            without saving anything, if the sharded model differs from them
+            by more than single-process models with different seeds do
+        dataset: Raw CSV to train on, e.g. one written by generate_dataset.py
+        shard_dir: Directory for the partition files, defaults to a temporary directory
+    
+    Returns:
+        True if the model was trained and saved
+    """
+    
+    # First clean the CSV file
+    clean_csv_file(dataset)
+    
+    # Load the cleaned data
+    print("Loading cleaned data...")
+    try:
+        df = pd.read_csv('movie_recommendation_dataset_cleaned.csv', encoding='utf-8')
+    except Exception as e:
+        print(f"Error reading cleaned CSV file: {e}")
+        return False
     
-    model.fit(X_train, y_train)
+    # Display basic info
+    print(f"Dataset shape: {df.shape}")
+    print(f"Columns: {list(df.columns)}")
+    print(f"Unique movies: {df['movie_title'].nunique()}")
+    print(f"Unique moods: {df['mood'].unique()}")
+    print(f"Unique weather: {df['weather'].unique()}")
+    print(f"Unique days: {df['day'].unique()}")
+    
+    # Check for missing values
+    print(f"\nMissing values:")
+    print(df.isnull().sum())
+    
+    df_filtered, encoders = encode_dataset(df)
+    mood_encoder = encoders['mood']
+    weather_encoder = encoders['weather']
+    day_encoder = encoders['day']
+    movie_encoder = encoders['movie']
+    X = df_filtered[FEATURE_COLUMNS]
+    y = df_filtered['movie_encoded']
+    
+    X_train, X_test, y_train, y_test = split_dataset(X, y)
+    
+    # Train Random Forest model
+    start = time.perf_counter()
+    if n_shards > 1:
+        print(f"Training Random Forest model across {n_shards} shards...")
+        model = train_distributed_forest(X_train, y_train, build_model(), n_shards=n_shards, max_workers=max_workers,
+                                         shard_dir=shard_dir)
+    else:
+        print("Training Random Forest model...")
+        model = build_model()
+        model.fit(X_train, y_train)
+    print(f"Training took {time.perf_counter() - start:.2f}s")
+    
+    if n_shards > 1 and verify and not verify_sharded_model(model, n_shards, X_train, y_train, X_test, y_test):
+        print("❌ Sharded model differs from single-process training by more than reseeding does; nothing was saved")
+        return False
     
     # Evaluate the model
     y_pred = model.predict(X_test)
@@ -198,18 +274,19 @@ def train_recommendation_model():
         print(f"Test set contains {len(test_classes)} unique movies")
         print(f"Predicted {len(np.unique(y_pred))} unique movies")
     
-    # Save the model and encoders
+    # Save the model and encoders; each file is replaced atomically so an
+    # interrupted run never leaves a half-written artifact behind
     print("Saving model and encoders...")
-    joblib.dump(model, 'model.pkl')
-    joblib.dump(mood_encoder, 'mood_encoder.pkl')
-    joblib.dump(weather_encoder, 'weather_encoder.pkl')
-    joblib.dump(day_encoder, 'day_encoder.pkl')
-    joblib.dump(movie_encoder, 'movie_encoder.pkl')
+    atomic_write('model.pkl', lambda f: joblib.dump(model, f))
+    atomic_write('mood_encoder.pkl', lambda f: joblib.dump(mood_encoder, f))
+    atomic_write('weather_encoder.pkl', lambda f: joblib.dump(weather_encoder, f))
+    atomic_write('day_encoder.pkl', lambda f: joblib.dump(day_encoder, f))
+    atomic_write('movie_encoder.pkl', lambda f: joblib.dump(movie_encoder, f))
     
     # Save movie metadata with all available information
     movie_metadata = df_filtered[['movie_title', 'year', 'genre', 'description']].drop_duplicates(subset=['movie_title']).to_dict('records')
-    with open('movie_metadata.json', 'w', encoding='utf-8') as f:
-        json.dump(movie_metadata, f, indent=2, ensure_ascii=False)
+    atomic_write('movie_metadata.json', lambda f: json.dump(movie_metadata, f, indent=2, ensure_ascii=False),
+                 binary=False)
     
     # Save encoder mappings for API
     encoder_mappings = {
@@ -219,8 +296,12 @@ def train_recommendation_model():
         'movies': {i: label for i, label in enumerate(movie_encoder.classes_)}
     }
     
-    with open('encoder_mappings.json', 'w', encoding='utf-8') as f:
-        json.dump(encoder_mappings, f, indent=2, ensure_ascii=False)
+    atomic_write('encoder_mappings.json', lambda f: json.dump(encoder_mappings, f, indent=2, ensure_ascii=False),
+                 binary=False)
+    
+    # Record checksums last: until the manifest matches, the server keeps
+    # loading the previous known-good set
+    write_manifest()
     
     print("Model training completed!")
     print("Files saved:")
@@ -231,6 +312,23 @@ def train_recommendation_model():
     print("- movie_encoder.pkl (movie label encoder)")
     print("- movie_metadata.json (movie metadata with year, genre, description)")
     print("- encoder_mappings.json (encoder mappings)")
+    print("- artifact_manifest.json (artifact checksums)")
+    return True
 
 if __name__ == "__main__":
-    train_recommendation_model() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Train the movie recommendation model.")
+    parser.add_argument('--shards', type=int, default=1,
+                        help="Train data-parallel across this many worker processes")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Worker pool size (defaults to the number of shards)")
+    parser.add_argument('--verify', action='store_true',
+                        help="Compare a sharded model against single-process training")
+    parser.add_argument('--dataset', default='movie_recommendation_dataset.csv',
+                        help="Raw CSV to train on")
+    parser.add_argument('--shard-dir', default=None,
+                        help="Directory for the partition files (defaults to a temporary directory)")
+    args = parser.parse_args()
+    
+    if not train_recommendation_model(n_shards=args.shards, max_workers=args.workers, verify=args.verify,
+                                      dataset=args.dataset, shard_dir=args.shard_dir):
+        sys.exit(1) 
\ No newline at end of file
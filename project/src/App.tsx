@@ -17,6 +17,7 @@ function App() {
   const [showRecommendations, setShowRecommendations] = useState(false);
   const [apiConnected, setApiConnected] = useState<boolean | null>(null);
   const [error, setError] = useState<string | null>(null);
+  const [snapshotAvailable, setSnapshotAvailable] = useState(false);
 
   useEffect(() => {
     // Auto-detect day type based on current day
@@ -33,7 +34,10 @@ function App() {
     try {
       const connected = await mlRecommender.checkConnection();
       setApiConnected(connected);
-      if (!connected) {
+      // Fetch (or revalidate) the snapshot so later selections are answered locally
+      const snapshotReady = await mlRecommender.loadSnapshot();
+      setSnapshotAvailable(snapshotReady);
+      if (!connected && !snapshotReady) {
         console.warn('ML Backend not connected. Using fallback recommendations.');
       }
     } catch (error) {
@@ -54,8 +58,8 @@ function App() {
     try {
       let recs: ScoredMovie[] = [];
 
-      if (apiConnected) {
-        // Use ML-powered backend
+      if (apiConnected || snapshotAvailable) {
+        // Use ML-powered backend, or its saved snapshot when offline
         recs = await mlRecommender.getMultipleRecommendations({
           mood: selectedMood,
           weather: selectedWeather,
@@ -110,7 +114,9 @@ function App() {
               }`}></div>
               {apiConnected 
                 ? '🤖 ML-Powered Recommendations Active' 
-                : '⚠️ Using Fallback Recommendations (ML Backend Unavailable)'
+                : snapshotAvailable
+                  ? '📦 Offline: Using Saved ML Recommendations'
+                  : '⚠️ Using Fallback Recommendations (ML Backend Unavailable)'
               }
             </div>
           </div>
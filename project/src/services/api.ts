@@ -38,6 +38,27 @@ export interface MultipleRecommendationRequest extends RecommendationRequest {
   num_recommendations?: number;
 }
 
+export interface SnapshotRanking {
+  ids: number[];
+  confidences: number[];
+}
+
+export interface RecommendationSnapshot {
+  schema_version: number;
+  version: string;
+  options: AvailableOptions;
+  num_recommendations: number;
+  movies: {
+    titles: string[];
+    years: (number | null)[];
+    genre_codes: number[];
+    genre_names: string[];
+    descriptions: (string | null)[];
+  };
+  // Keyed by "mood|weather|day"
+  rankings: Record<string, SnapshotRanking>;
+}
+
 class ApiService {
   private baseUrl: string;
 
@@ -98,6 +119,24 @@ class ApiService {
     });
   }
 
+  // Get ranked recommendations for every context. Returns null when the
+  // snapshot identified by etag is still current.
+  async getSnapshot(etag?: string): Promise<{ snapshot: RecommendationSnapshot; etag: string } | null> {
+    const response = await fetch(`${this.baseUrl}/snapshot`, {
+      headers: etag ? { 'If-None-Match': etag } : {},
+    });
+
+    if (response.status === 304) {
+      return null;
+    }
+    if (!response.ok) {
+      throw new Error(`HTTP error! status: ${response.status}`);
+    }
+
+    const snapshot: RecommendationSnapshot = await response.json();
+    return { snapshot, etag: response.headers.get('ETag') || `"${snapshot.version}"` };
+  }
+
   // Health check
   async healthCheck(): Promise<{ status: string; message: string }> {
     return this.makeRequest<{ status: string; message: string }>('/health');
@@ -1,4 +1,4 @@
-import { apiService, MovieRecommendation, MultipleMovieRecommendation } from '../services/api';
+import { apiService, MovieRecommendation, MultipleMovieRecommendation, RecommendationSnapshot } from '../services/api';
 
 export type Mood = 'Happy' | 'Relaxed' | 'Melancholic' | 'Romantic' | 'Excited' | 'Adventurous';
 export type Weather = 'Sunny' | 'Rainy' | 'Cloudy' | 'Snowy';
@@ -21,12 +21,29 @@ export interface ScoredMovie {
   description?: string;
 }
 
+const SNAPSHOT_STORAGE_KEY = 'ml-recommender-snapshot';
+
 export class MLMovieRecommender {
   private static instance: MLMovieRecommender;
   private isConnected: boolean = false;
   private connectionChecked: boolean = false;
+  private snapshot: RecommendationSnapshot | null = null;
+  private snapshotEtag: string | undefined;
+  private snapshotRequest: Promise<boolean> | null = null;
 
-  private constructor() { }
+  private constructor() {
+    // Restore the last snapshot so recommendations work offline after a reload
+    try {
+      const stored = localStorage.getItem(SNAPSHOT_STORAGE_KEY);
+      if (stored) {
+        const { snapshot, etag } = JSON.parse(stored);
+        this.snapshot = snapshot;
+        this.snapshotEtag = etag;
+      }
+    } catch (error) {
+      console.warn('Ignoring unreadable stored snapshot:', error);
+    }
+  }
 
   static getInstance(): MLMovieRecommender {
     if (!MLMovieRecommender.instance) {
@@ -53,6 +70,53 @@ export class MLMovieRecommender {
     }
   }
 
+  // Fetch or revalidate the recommendation snapshot, once per session.
+  // Resolves to whether a snapshot (fresh or stored) is available.
+  loadSnapshot(): Promise<boolean> {
+    if (!this.snapshotRequest) {
+      this.snapshotRequest = (async () => {
+        try {
+          const result = await apiService.getSnapshot(this.snapshotEtag);
+          if (result) {
+            this.snapshot = result.snapshot;
+            this.snapshotEtag = result.etag;
+            try {
+              localStorage.setItem(SNAPSHOT_STORAGE_KEY, JSON.stringify(result));
+            } catch (error) {
+              console.warn('Could not store snapshot:', error);
+            }
+          }
+        } catch (error) {
+          console.warn('Could not refresh snapshot, using stored copy if any:', error);
+        }
+        return this.snapshot !== null;
+      })();
+    }
+    return this.snapshotRequest;
+  }
+
+  hasSnapshot(): boolean {
+    return this.snapshot !== null;
+  }
+
+  // Look up ranked recommendations in the snapshot, without a network request
+  private getSnapshotRecommendations(input: RecommendationInput, limit: number): MultipleMovieRecommendation[] | null {
+    const ranking = this.snapshot?.rankings[`${input.mood}|${input.weather}|${input.day}`];
+    if (!this.snapshot || !ranking) {
+      return null;
+    }
+
+    const { movies } = this.snapshot;
+    return ranking.ids.slice(0, limit).map((id, index) => ({
+      movie_title: movies.titles[id],
+      confidence: ranking.confidences[index],
+      rank: index + 1,
+      year: movies.years[id] ?? undefined,
+      genre: movies.genre_codes[id] >= 0 ? movies.genre_names[movies.genre_codes[id]] : undefined,
+      description: movies.descriptions[id] ?? undefined
+    }));
+  }
+
   // Get available options from backend
   async getAvailableOptions(): Promise<{ moods: Mood[]; weather: Weather[]; days: DayType[] } | null> {
     try {
@@ -97,6 +161,12 @@ export class MLMovieRecommender {
 
   // Get single recommendation
   async getRecommendation(input: RecommendationInput): Promise<ScoredMovie | null> {
+    await this.loadSnapshot();
+    const local = this.getSnapshotRecommendations(input, 1);
+    if (local && local.length > 0) {
+      return this.convertMultipleRecommendations(local)[0];
+    }
+
     try {
       const recommendation = await apiService.getRecommendation({
         mood: input.mood,
@@ -116,6 +186,12 @@ export class MLMovieRecommender {
     input: RecommendationInput,
     limit: number = 6
   ): Promise<ScoredMovie[]> {
+    await this.loadSnapshot();
+    const local = this.getSnapshotRecommendations(input, limit);
+    if (local) {
+      return this.convertMultipleRecommendations(local);
+    }
+
     try {
       const recommendations = await apiService.getMultipleRecommendations({
         mood: input.mood,